@@ -0,0 +1,72 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from lib.client import AnacreonClient
+from .models import KEYFRAME_INTERVAL, GameData
+from .rollups import RollupBatch
+from .snapshots import record_snapshot
+
+
+class Target:
+    # one (login, game) pair, fetched not more often than min_interval seconds
+    def __init__(self, client: AnacreonClient, min_interval: float = 0):
+        self.client = client
+        self.min_interval = min_interval
+        self.next_fetch = 0
+
+    def __str__(self):
+        return '%s@%s' % (self.client.login, self.client.game_id)
+
+    def fetch(self) -> tuple:
+        # blocking, runs in executor thread
+        return self.client.get_game_info(), self.client.get_objects()
+
+
+async def fetch_target(target: Target, semaphore: asyncio.Semaphore, executor: ThreadPoolExecutor) -> tuple:
+    delay = target.next_fetch - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    async with semaphore:
+        target.next_fetch = time.monotonic() + target.min_interval
+        start = time.monotonic()
+        try:
+            game_info, game_objects = await asyncio.get_running_loop().run_in_executor(executor, target.fetch)
+        except Exception as e:
+            print('%s: fetch failed: %s %s' % (target, e.__class__.__name__, e))
+            return target, None, None
+        print('%s: fetched in %.2fs, %s' % (target, time.monotonic() - start, target.client.sync_info()))
+        return target, game_info, game_objects
+
+
+def write_batch(results: list, keyframe_interval: int = KEYFRAME_INTERVAL) -> list:
+    snapshots = []
+    rollups = RollupBatch()
+    with transaction.atomic():
+        for target, game_info, game_objects in results:
+            if game_info is None:
+                continue
+            snapshot = GameData.objects.create_snapshot(
+                gameInfo=game_info,
+                gameObjects=game_objects,
+                sovID=target.client.sov_id,
+                gameID=int(target.client.game_id),
+                keyframe_interval=keyframe_interval
+            )
+            record_snapshot(snapshot, game_objects)
+            rollups.add(snapshot, game_objects)
+            snapshots.append(snapshot)
+        rollups.flush()
+    return snapshots
+
+
+async def collect(targets: list, concurrency: int = 4, keyframe_interval: int = KEYFRAME_INTERVAL) -> list:
+    # fetches every target concurrently, then writes all snapshots in one transaction
+    semaphore = asyncio.Semaphore(concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:  # api client is blocking
+        results = await asyncio.gather(*(fetch_target(x, semaphore, executor) for x in targets))
+    return await sync_to_async(write_batch)(results, keyframe_interval)
@@ -0,0 +1,44 @@
+# Delta encoding of game snapshots. Objects are matched by their id,
+# changed objects are stored whole, objects without id (like sequence updates) are stored every time.
+
+
+def index_objects(objects: list) -> tuple:
+    by_id, other = {}, []
+    for obj in objects:
+        if isinstance(obj, dict) and 'id' in obj:
+            by_id[obj['id']] = obj
+        else:
+            other.append(obj)
+    return by_id, other
+
+
+def diff_objects(previous: list, current: list) -> dict:
+    previous, _ = index_objects(previous)
+    current, other = index_objects(current)
+    return {
+        'changed': [obj for id, obj in current.items() if previous.get(id) != obj],
+        'removed': [id for id in previous if id not in current],
+        'other': other,
+    }
+
+
+def apply_objects_delta(objects: list, delta: dict) -> list:
+    by_id, _ = index_objects(objects)
+    for id in delta['removed']:
+        by_id.pop(id, None)
+    for obj in delta['changed']:
+        by_id[obj['id']] = obj
+    return list(by_id.values()) + delta['other']
+
+
+def diff_info(previous: dict, current: dict) -> dict:
+    return {
+        'changed': {key: value for key, value in current.items() if previous.get(key) != value},
+        'removed': [key for key in previous if key not in current],
+    }
+
+
+def apply_info_delta(info: dict, delta: dict) -> dict:
+    info = {key: value for key, value in info.items() if key not in delta['removed']}
+    info.update(delta['changed'])
+    return info
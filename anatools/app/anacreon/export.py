@@ -0,0 +1,122 @@
+import csv
+import gzip
+import json
+import os
+
+from .models import GameData
+from .snapshots import allocations
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional, gzipped csv is written without it
+    pyarrow = None
+
+STATE_FILE = '_export_state.json'
+
+# table -> (column, type), every row starts with the snapshot columns
+SNAPSHOT_COLUMNS = [('snapshotID', 'int'), ('timestamp', 'timestamp'), ('gameID', 'int'), ('sovID', 'int')]
+TABLES = {
+    'objects': SNAPSHOT_COLUMNS + [('objID', 'int'), ('objClass', 'string'), ('sovereignID', 'int'),
+                                   ('designation', 'int'), ('techLevel', 'int'), ('posX', 'float'),
+                                   ('posY', 'float')],
+    'routes': SNAPSHOT_COLUMNS + [('objID', 'int'), ('partnerID', 'int'), ('allocType', 'string'),
+                                  ('resourceID', 'int'), ('allocation', 'float')],
+    'traits': SNAPSHOT_COLUMNS + [('objID', 'int'), ('traitID', 'int')],
+}
+FORMATS = ('parquet', 'arrow', 'csv')
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv.gz'}
+
+
+def snapshot_rows(snapshot: GameData, game_objects: list) -> dict:
+    # table -> rows of one snapshot
+    head = snapshot.id, snapshot.timestamp, snapshot.gameID, snapshot.sovID
+    rows = {x: [] for x in TABLES}
+    for obj in game_objects:
+        if not isinstance(obj, dict) or 'id' not in obj or 'class' not in obj:
+            continue  # sequence updates and other service objects
+        pos = obj.get('pos') or (None, None)
+        rows['objects'].append(head + (obj['id'], obj['class'], obj.get('sovereignID'), obj.get('designation'),
+                                       obj.get('techLevel'), pos[0], pos[1]))
+        for trait in obj.get('traits', []):
+            rows['traits'].append(head + (obj['id'], trait if type(trait) is int else trait['traitID']))
+    for obj, partner_id, alloc_type, resource, allocation in allocations(game_objects):
+        rows['routes'].append(head + (obj['id'], partner_id, alloc_type, resource, allocation))
+    return rows
+
+
+def arrow_schema(table: str):
+    types = {'int': pyarrow.int64(), 'float': pyarrow.float64(), 'string': pyarrow.string(),
+             'timestamp': pyarrow.timestamp('us', tz='UTC')}
+    return pyarrow.schema([(name, types[kind]) for name, kind in TABLES[table]])
+
+
+def write_file(path: str, table: str, rows: list, file_format: str):
+    # written under a temporary name, so a crash never leaves a partial file behind
+    tmp_path = path + '.tmp'
+    if file_format == 'csv':
+        with gzip.open(tmp_path, 'wt', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(name for name, _ in TABLES[table])
+            writer.writerows(rows)
+    else:
+        schema = arrow_schema(table)
+        data = pyarrow.Table.from_arrays([pyarrow.array(x, type=t) for x, t in zip(zip(*rows), schema.types)],
+                                         schema=schema)
+        if file_format == 'parquet':
+            pyarrow.parquet.write_table(data, tmp_path)
+        else:
+            with pyarrow.OSFile(tmp_path, 'wb') as sink, pyarrow.ipc.new_file(sink, schema) as writer:
+                writer.write_table(data)
+    os.replace(tmp_path, path)
+
+
+class Exporter:
+    # Buffers rows of consecutive snapshots and writes them as one part file per table, partitioned by date:
+    # <output>/<table>/date=YYYY-MM-DD/part-<first snapshot id>.<ext>. The state file keeps the last
+    # snapshot id written, so an interrupted or repeated export continues after it.
+    def __init__(self, output: str, file_format: str, rows_per_file: int):
+        self.output = output
+        self.file_format = file_format
+        self.rows_per_file = rows_per_file
+        self.rows = {x: [] for x in TABLES}
+        self.date = None
+        self.first_id = self.last_id = None
+        self.written = {x: 0 for x in TABLES}
+        self.files = 0
+
+    def last_exported(self) -> int:
+        try:
+            with open(os.path.join(self.output, STATE_FILE)) as f:
+                return json.load(f)['last_id']
+        except FileNotFoundError:
+            return 0
+
+    def add(self, snapshot: GameData, game_objects: list):
+        date = snapshot.timestamp.date()
+        if date != self.date or max(len(x) for x in self.rows.values()) >= self.rows_per_file:
+            self.flush()
+            self.date, self.first_id = date, snapshot.id
+        for table, rows in snapshot_rows(snapshot, game_objects).items():
+            self.rows[table].extend(rows)
+        self.last_id = snapshot.id
+
+    def flush(self):
+        if self.first_id is None:
+            return
+        for table, rows in self.rows.items():
+            if not rows:
+                continue
+            directory = os.path.join(self.output, table, 'date=%s' % self.date.isoformat())
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, 'part-%d%s' % (self.first_id, EXTENSIONS[self.file_format]))
+            write_file(path, table, rows, self.file_format)
+            self.written[table] += len(rows)
+            self.files += 1
+            rows.clear()
+
+        with open(os.path.join(self.output, STATE_FILE + '.tmp'), 'w') as f:
+            json.dump({'last_id': self.last_id, 'format': self.file_format}, f)
+        os.replace(os.path.join(self.output, STATE_FILE + '.tmp'), os.path.join(self.output, STATE_FILE))
+        self.first_id = None
@@ -0,0 +1,101 @@
+import json
+import zlib
+
+from django.db import models
+
+
+class ZlibCodec:
+    name = 'zlib'
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class RawCodec:
+    name = 'raw'
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+CODECS = {}
+
+
+def register_codec(codec):
+    CODECS[codec.name] = codec
+
+
+register_codec(ZlibCodec())
+register_codec(RawCodec())
+
+
+# stored value is '<codec name>:<compressed json>', so rows written with different codecs can be mixed
+
+def encode(value, codec: str = 'zlib') -> bytes:
+    data = json.dumps(value, separators=(',', ':')).encode()
+    return codec.encode() + b':' + CODECS[codec].compress(data)
+
+
+def decode(data):
+    if isinstance(data, str):  # plain json text, not converted yet
+        return json.loads(data)
+    codec, _, payload = bytes(data).partition(b':')
+    return json.loads(CODECS[codec.decode()].decompress(payload))
+
+
+class LazyJSONDescriptor:
+    # keeps raw bytes loaded from db until the attribute is read for the first time
+    def __init__(self, field):
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance.__dict__.get(self.field.attname)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = instance.__dict__[self.field.attname] = decode(value)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedJSONField(models.BinaryField):
+    def __init__(self, *args, codec: str = 'zlib', **kwargs):
+        self.codec = codec
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.codec != 'zlib':
+            kwargs['codec'] = self.codec
+        return name, path, args, kwargs
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super().contribute_to_class(cls, name, *args, **kwargs)
+        setattr(cls, self.name, LazyJSONDescriptor(self))
+
+    def from_db_value(self, value, expression, connection):
+        return value  # decoded lazily by the descriptor
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview, str)):
+            return decode(value)
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is not None and not isinstance(value, (bytes, bytearray, memoryview)):
+            value = encode(value, self.codec)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj))
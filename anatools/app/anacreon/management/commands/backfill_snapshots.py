@@ -0,0 +1,42 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from app.anacreon.models import GameData, ObjectSnapshot
+from app.anacreon.snapshots import BATCH_SIZE, record_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Fill ObjectSnapshot and TradeRouteSnapshot tables from stored GameData.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-b', '--batch-size',
+            type=int, default=100,
+            help='Number of snapshots processed in one transaction. Default is 100.'
+        )
+
+    def handle(self, *args, **options):
+        done = set(ObjectSnapshot.objects.values_list('snapshot_id', flat=True).distinct())
+        total = GameData.objects.count()
+        print('Snapshots: %d total, %d already processed' % (total, len(done)))
+
+        batch = []
+        processed = 0
+        for snapshot, game_info, game_objects in GameData.objects.iter_full(chunk_size=options['batch_size']):
+            if snapshot.id in done:
+                continue
+            batch.append((snapshot, game_objects))
+            if len(batch) >= options['batch_size']:
+                processed += self.write(batch)
+                print('Processed %d snapshots...' % processed)
+        processed += self.write(batch)
+        print('Done, %d snapshots processed' % processed)
+
+    @staticmethod
+    def write(batch: list) -> int:
+        with transaction.atomic():
+            for snapshot, game_objects in batch:
+                record_snapshot(snapshot, game_objects, BATCH_SIZE)
+        count = len(batch)
+        batch.clear()
+        return count
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import sys
+from time import monotonic, sleep
+
+from django.core.management import BaseCommand
+
+sys.path.append("..")
+from app.anacreon.collector import Target, collect
+from app.anacreon.models import KEYFRAME_INTERVAL
+from lib.client import AnacreonClient, pooled_session
+
+
+class Command(BaseCommand):
+    help = 'Collect game data of several games and sovereigns concurrently.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets',
+            help='Json file with a list of targets: [{"login": ..., "password": ..., "game": ..., '
+                 '"min_interval": <seconds between fetches, optional>}, ...]'
+        )
+        parser.add_argument(
+            '-i', '--interval',
+            nargs='?', type=int, default=1, const=1,
+            help='Interval between updates, in minutes. Default is 1 min. Use 0 to update only once.'
+        )
+        parser.add_argument(
+            '-c', '--concurrency',
+            type=int, default=4,
+            help='Max number of targets fetched at the same time. Default is 4.'
+        )
+        parser.add_argument(
+            '-k', '--keyframe-interval',
+            type=int, default=KEYFRAME_INTERVAL,
+            help='Store full snapshot every N updates. Default is %d.' % KEYFRAME_INTERVAL
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Request only objects changed since the last update sequence of each target.'
+        )
+        parser.add_argument(
+            '--api-url',
+            help='Send api requests to this url instead of HexArc server, e.g. a local stand-in.'
+        )
+
+    def handle(self, *args, **options):
+        with open(options['targets']) as f:
+            config = json.load(f)
+
+        # every client has its own session: auth cookies and connections of one login aren't shared with another,
+        # fetches of one target are sequential, so one connection is enough
+        targets = [Target(AnacreonClient(x['login'], x['password'], x['game'], pooled_session(1, options['api_url']),
+                                         options['incremental']),
+                          x.get('min_interval', 0))
+                   for x in config]
+        print('Targets: %s' % [str(x) for x in targets])
+
+        interval = options['interval']
+        start = monotonic()
+        counter = 0
+        while True:
+            print('Update #%d...' % counter)
+            counter += 1
+
+            tick_start = monotonic()
+            snapshots = asyncio.run(collect(targets, options['concurrency'], options['keyframe_interval']))
+            print('Stored %d of %d snapshots in %.2fs' % (len(snapshots), len(targets), monotonic() - tick_start))
+
+            if interval == 0:
+                break
+
+            period = interval * 60
+            next_tick = start + (int((monotonic() - start) // period) + 1) * period
+            sleep(max(0, next_tick - monotonic()))
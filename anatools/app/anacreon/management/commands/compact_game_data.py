@@ -0,0 +1,140 @@
+from collections import Counter
+from datetime import timedelta
+from time import sleep
+
+from django.core.management import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from app.anacreon.models import GameData
+from app.anacreon.retention import KEEP_ALL, KEEP_HOURLY, Row, plan_compaction
+
+
+class Command(BaseCommand):
+    help = ('Thin out old GameData: every snapshot is kept for %d hours, one per hour after that and one per day '
+            'after %d days. Object and route snapshots are deleted with them, rollups are kept. '
+            'Deletes run in small transactions with pauses between them. --vacuum locks the whole '
+            'database until it finishes.' % (KEEP_ALL.total_seconds() // 3600, KEEP_HOURLY.days))
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-all',
+            type=float, default=KEEP_ALL.total_seconds() / 3600,
+            help='Keep every snapshot for this many hours. Default is %(default)g.'
+        )
+        parser.add_argument(
+            '--keep-hourly',
+            type=float, default=KEEP_HOURLY.days,
+            help='Keep one snapshot per hour for this many days, one per day after that. Default is %(default)g.'
+        )
+        parser.add_argument(
+            '-b', '--batch-size',
+            type=int, default=100,
+            help='Number of snapshots deleted in one transaction. Default is 100.'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float, default=0.2,
+            help='Seconds to wait between transactions, so other writers get the database. Default is 0.2.'
+        )
+        parser.add_argument(
+            '--game',
+            type=int,
+            help='Compact only snapshots of this game.'
+        )
+        parser.add_argument(
+            '--sov',
+            type=int,
+            help='Compact only snapshots collected by this sovereign.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only print what would be deleted.'
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Run VACUUM to give freed pages back to the file system. It locks the whole database while it '
+                 'runs, stop update_game_data and collect_game_data first. Without it freed pages are reused by '
+                 'new rows.'
+        )
+
+    def handle(self, *args, **options):
+        size_before = database_size()
+        snapshots = GameData.objects.of(options['game'], options['sov'])
+        rows = (Row(*x) for x in snapshots.order_by('id').values_list('id', 'gameID', 'sovID', 'timestamp', 'is_delta',
+                                                                          'keyframe_id').iterator())
+
+        chains = plan_compaction(rows, timezone.now(), timedelta(hours=options['keep_all']),
+                                 timedelta(days=options['keep_hourly']))
+        print('Snapshots to delete: %d, to rewrite as full: %d, in %d chains' % (
+            sum(len(x.drop) for x in chains), sum(len(x.materialize) for x in chains), len(chains)))
+        if options['dry_run']:
+            return
+
+        deleted = Counter()
+        pending = []
+        for chain in chains:
+            if chain.materialize:
+                self.materialize(chain.materialize)
+                sleep(options['pause'])
+            pending.extend(sorted(chain.drop, reverse=True))  # deltas before their keyframe, it cascades to them
+            while len(pending) >= options['batch_size']:
+                deleted.update(self.delete(pending[:options['batch_size']]))
+                del pending[:options['batch_size']]
+                print('Deleted %d snapshots...' % deleted[GameData._meta.label])
+                sleep(options['pause'])
+        deleted.update(self.delete(pending))
+
+        for label, count in sorted(deleted.items()):
+            print('%s: %d rows deleted' % (label, count))
+
+        if options['vacuum']:
+            try:
+                run_sql('VACUUM')
+            except OperationalError as e:
+                print('VACUUM failed: %s, freed pages will be reused by new rows' % e)
+        run_sql('ANALYZE')
+
+        size_after = database_size()
+        if size_before is not None and size_after is not None:
+            print('Database size: %.1f MB -> %.1f MB, %d bytes reclaimed' % (
+                size_before / 2 ** 20, size_after / 2 ** 20, size_before - size_after))
+
+    @staticmethod
+    def materialize(ids: list):
+        # full data of every delta is built before any of them is saved: later ones are built through earlier ones
+        with transaction.atomic():
+            snapshots = list(GameData.objects.filter(id__in=ids))
+            data = {x.id: x.full_data() for x in snapshots}
+            for snapshot in snapshots:
+                snapshot.gameInfo, snapshot.gameObjects = data[snapshot.id]
+                snapshot.is_delta, snapshot.keyframe = False, None
+                snapshot.save(update_fields=['gameInfo', 'gameObjects', 'is_delta', 'keyframe'])
+
+    @staticmethod
+    def delete(ids: list) -> dict:
+        if not ids:
+            return {}
+        with transaction.atomic():
+            _, deleted = GameData.objects.filter(id__in=ids).delete()
+        return deleted
+
+
+def run_sql(sql: str):
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+
+
+def database_size() -> int:
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('PRAGMA page_count')
+            pages = cursor.fetchone()[0]
+            cursor.execute('PRAGMA page_size')
+            return pages * cursor.fetchone()[0]
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_database_size(current_database())')
+            return cursor.fetchone()[0]
+    return None
@@ -0,0 +1,58 @@
+from django.core.management import BaseCommand, CommandError
+
+from app.anacreon.export import FORMATS, Exporter, pyarrow
+from app.anacreon.models import GameData
+
+
+class Command(BaseCommand):
+    help = ('Export snapshot history as columnar files for pandas or DuckDB: objects, route allocations and '
+            'traits tables, partitioned by date. Only snapshots newer than the last export are written.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Directory to export to.'
+        )
+        parser.add_argument(
+            '-f', '--format',
+            choices=FORMATS, default='parquet' if pyarrow else 'csv',
+            help='File format, parquet and arrow need pyarrow. Default is parquet if pyarrow is installed, '
+                 'gzipped csv otherwise.'
+        )
+        parser.add_argument(
+            '-r', '--rows-per-file',
+            type=int, default=500000,
+            help='Start a new part file when a table has that many rows buffered, it bounds memory use. '
+                 'Default is 500000.'
+        )
+        parser.add_argument(
+            '-b', '--batch-size',
+            type=int, default=100,
+            help='Number of snapshots read from the database at once. Default is 100.'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Export all snapshots, not only new ones.'
+        )
+
+    def handle(self, *args, **options):
+        if options['format'] != 'csv' and pyarrow is None:
+            raise CommandError('%s format needs pyarrow, install it or use --format csv' % options['format'])
+
+        exporter = Exporter(options['output'], options['format'], options['rows_per_file'])
+        after_id = 0 if options['full'] else exporter.last_exported()
+        total = GameData.objects.filter(id__gt=after_id).count()
+        print('Snapshots to export: %d, after id %d' % (total, after_id))
+
+        processed = 0
+        for snapshot, game_info, game_objects in GameData.objects.iter_full(after_id=after_id,
+                                                                            chunk_size=options['batch_size']):
+            exporter.add(snapshot, game_objects)
+            processed += 1
+            if processed % 1000 == 0:
+                print('Processed %d snapshots...' % processed)
+        exporter.flush()
+
+        print('Done, %d snapshots exported to %d files: %s' % (
+            processed, exporter.files, ', '.join('%s %d rows' % x for x in exporter.written.items())))
@@ -0,0 +1,70 @@
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+
+from app.anacreon.models import GameData
+from app.anacreon.rollups import ROLLUPS, RollupBatch
+
+
+class Command(BaseCommand):
+    help = ('Rebuild hourly and daily rollup tables from stored GameData. Snapshots that collectors write while '
+            'it runs are rolled up by collectors, the rebuild stops at the last snapshot that existed when it started.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-b', '--batch-size',
+            type=int, default=100,
+            help='Number of snapshots processed in one transaction. Default is 100.'
+        )
+        parser.add_argument(
+            '--game',
+            type=int,
+            help='Rebuild only rollups of snapshots of this game.'
+        )
+        parser.add_argument(
+            '--sov',
+            type=int,
+            help='Rebuild only rollups of snapshots collected by this sovereign.'
+        )
+
+    def handle(self, *args, **options):
+        game_id, sov_id = options['game'], options['sov']
+        with transaction.atomic():
+            # Collectors write a snapshot and its rollups in one transaction. Last id is read after the delete,
+            # within the same transaction, so every snapshot is either deleted from rollups and rebuilt here,
+            # or written after it and rolled up by its collector, never both.
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:  # waits for collectors that are writing, holds new ones
+                    cursor.execute('LOCK TABLE %s IN SHARE MODE' % GameData._meta.db_table)
+            for model in ROLLUPS:
+                rows = model.objects.all()
+                if game_id is not None:
+                    rows = rows.filter(gameID=game_id)
+                if sov_id is not None:
+                    rows = rows.filter(sovID=sov_id)
+                deleted, _ = rows.delete()
+                print('%s: %d rows deleted' % (model.__name__, deleted))
+            last_id = GameData.objects.aggregate(last=Max('id'))['last'] or 0
+
+        print('Snapshots: %d, up to id %d' % (GameData.objects.of(game_id, sov_id).filter(id__lte=last_id).count(),
+                                             last_id))
+
+        # snapshots of one batch usually share buckets, so most of them are merged in memory
+        batch = RollupBatch()
+        processed = 0
+        snapshots = GameData.objects.iter_full(sov_id, chunk_size=options['batch_size'], gameID=game_id,
+                                               until_id=last_id)
+        for snapshot, game_info, game_objects in snapshots:
+            batch.add(snapshot, game_objects)
+            if len(batch) >= options['batch_size']:
+                processed += self.write(batch)
+                print('Processed %d snapshots...' % processed)
+        processed += self.write(batch)
+        print('Done, %d snapshots processed' % processed)
+
+    @staticmethod
+    def write(batch: RollupBatch) -> int:
+        count = len(batch)
+        with transaction.atomic():
+            batch.flush()
+        return count
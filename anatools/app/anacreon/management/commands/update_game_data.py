@@ -1,12 +1,16 @@
 import os
 import sys
-from time import sleep
+from time import monotonic, sleep
 
 from django.core.management import BaseCommand
+from django.db import transaction
 
 sys.path.append("..")
-from app.anacreon.models import GameData
-from lib.anacreonlib.anacreon import Anacreon
+from app.anacreon.models import KEYFRAME_INTERVAL, GameData
+from app.anacreon.rollups import record_rollups
+from app.anacreon.snapshots import record_snapshot
+from lib.client import AnacreonClient
+from lib.metrics import Metrics, profiled
 
 
 class Command(BaseCommand):
@@ -16,28 +20,85 @@ class Command(BaseCommand):
             nargs='?', type=int, default=1, const=1,
             help='Interval between updates, in minutes. Default is 1 min. Use 0 to update only once.'
         )
+        parser.add_argument(
+            '-k', '--keyframe-interval',
+            type=int, default=KEYFRAME_INTERVAL,
+            help='Store full snapshot every N updates, only changes are stored in between. '
+                 'Default is %d. Use 0 to store only full snapshots.' % KEYFRAME_INTERVAL
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Request only objects changed since the last update sequence, all of them are fetched '
+                 'on the first update and when sequences get out of step.'
+        )
+        parser.add_argument(
+            '--metrics',
+            metavar='PATH',
+            help='Write phase times and api latency histograms as json after every update.'
+        )
+        parser.add_argument(
+            '--metrics-prom',
+            metavar='PATH',
+            help='Write the same metrics in Prometheus text format, e.g. for node_exporter textfile collector.'
+        )
+        parser.add_argument(
+            '--profile',
+            nargs='?', const='update_game_data.prof', metavar='PATH',
+            help='Run under cProfile, stats are printed and saved to PATH on exit.'
+        )
 
     def handle(self, *args, **options):
+        with profiled(options['profile']):
+            self.update(options)
+
+    @staticmethod
+    def update(options: dict):
         print('%s %s, game id: %s' % (os.environ.get('ANACREON_LOGIN'), os.environ.get('ANACREON_PASSWORD'),
                                       os.environ.get('ANACREON_GAME_ID')))
 
         interval = options['interval']
+        client = AnacreonClient(os.environ.get('ANACREON_LOGIN'), os.environ.get('ANACREON_PASSWORD'),
+                                os.environ.get('ANACREON_GAME_ID'), incremental=options['incremental'])
+        metrics = Metrics('poller')
+        metrics.attach(client.session)
+
+        # fixed rate schedule: ticks are planned from the start time, so fetch time doesn't add up
+        start = monotonic()
         counter = 0
         while True:
             print('Update #%d...' % counter)
             counter += 1
 
-            api = Anacreon(os.environ.get('ANACREON_LOGIN'), os.environ.get('ANACREON_PASSWORD'))
-            api.gameID = os.environ.get('ANACREON_GAME_ID')
+            metrics.start_run()
+            metrics.phase('fetch')
+            tick_start = monotonic()
+            game_info = client.get_game_info()
+            game_objects = client.get_objects()
+            fetch_time = monotonic() - tick_start
+
+            metrics.phase('db write')
+            with transaction.atomic():
+                snapshot = GameData.objects.create_snapshot(
+                    gameInfo=game_info,
+                    gameObjects=game_objects,
+                    sovID=client.sov_id,
+                    gameID=int(client.game_id),
+                    keyframe_interval=options['keyframe_interval']
+                )
+                record_snapshot(snapshot, game_objects)
+                record_rollups(snapshot, game_objects)
 
-            game_info = api.get_game_info()
-            api.sovID = game_info['userInfo']['sovereignID']
-            GameData.objects.create(
-                gameInfo=game_info,
-                gameObjects=api.get_objects(),
-                sovID=api.sovID
-            )
+            print('Fetch: %.2fs (game info %.2fs, objects %.2fs, %s), write: %.2fs, logins: %d' % (
+                fetch_time, client.latency['get_game_info'], client.latency['get_objects'], client.sync_info(),
+                monotonic() - tick_start - fetch_time, client.logins))
+            metrics.phase(None)
+            metrics.save(options['metrics'], options['metrics_prom'])
 
-            sleep(interval * 60)
             if interval == 0:
                 break
+
+            # skip ticks that were missed, if update took longer than interval
+            period = interval * 60
+            next_tick = start + (int((monotonic() - start) // period) + 1) * period
+            sleep(max(0, next_tick - monotonic()))
@@ -0,0 +1,61 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from app.anacreon.delta import apply_info_delta, apply_objects_delta, diff_info, diff_objects
+
+KEYFRAME_INTERVAL = 60
+
+
+def encode_deltas(apps, schema_editor):
+    GameData = apps.get_model('anacreon', 'GameData')
+    for sov_id in GameData.objects.values_list('sovID', flat=True).distinct():
+        previous = keyframe = None
+        count = 0
+        for snapshot in GameData.objects.filter(sovID=sov_id).order_by('id').iterator():
+            game_info, game_objects = snapshot.gameInfo, snapshot.gameObjects
+            if previous is None or count + 1 >= KEYFRAME_INTERVAL:
+                keyframe, count = snapshot, 0
+            else:
+                snapshot.gameInfo = diff_info(previous[0], game_info)
+                snapshot.gameObjects = diff_objects(previous[1], game_objects)
+                snapshot.is_delta = True
+                snapshot.keyframe = keyframe
+                snapshot.save(update_fields=['gameInfo', 'gameObjects', 'is_delta', 'keyframe'])
+                count += 1
+            previous = (game_info, game_objects)
+
+
+def decode_deltas(apps, schema_editor):
+    GameData = apps.get_model('anacreon', 'GameData')
+    for sov_id in GameData.objects.values_list('sovID', flat=True).distinct():
+        game_info = game_objects = None
+        for snapshot in GameData.objects.filter(sovID=sov_id).order_by('id').iterator():
+            if not snapshot.is_delta:
+                game_info, game_objects = snapshot.gameInfo, snapshot.gameObjects
+                continue
+            game_info = apply_info_delta(game_info, snapshot.gameInfo)
+            game_objects = apply_objects_delta(game_objects, snapshot.gameObjects)
+            snapshot.gameInfo, snapshot.gameObjects = game_info, game_objects
+            snapshot.is_delta, snapshot.keyframe = False, None
+            snapshot.save(update_fields=['gameInfo', 'gameObjects', 'is_delta', 'keyframe'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anacreon', '0003_auto_20190110_1911'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamedata',
+            name='is_delta',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='gamedata',
+            name='keyframe',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deltas', to='anacreon.GameData'),
+        ),
+        migrations.RunPython(encode_deltas, decode_deltas),
+    ]
@@ -0,0 +1,92 @@
+from django.db import migrations
+import jsonfield.encoder
+import jsonfield.fields
+
+import app.anacreon.fields
+
+
+def compress(apps, schema_editor):
+    GameData = apps.get_model('anacreon', 'GameData')
+    for snapshot in GameData.objects.iterator():
+        snapshot.gameInfoCompressed = snapshot.gameInfo
+        snapshot.gameObjectsCompressed = snapshot.gameObjects
+        snapshot.save(update_fields=['gameInfoCompressed', 'gameObjectsCompressed'])
+
+
+def decompress(apps, schema_editor):
+    GameData = apps.get_model('anacreon', 'GameData')
+    for snapshot in GameData.objects.iterator():
+        snapshot.gameInfoJSON = snapshot.gameInfoCompressed
+        snapshot.gameObjectsJSON = snapshot.gameObjectsCompressed
+        snapshot.save(update_fields=['gameInfoJSON', 'gameObjectsJSON'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anacreon', '0004_gamedata_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamedata',
+            name='gameInfoCompressed',
+            field=app.anacreon.fields.CompressedJSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='gamedata',
+            name='gameObjectsCompressed',
+            field=app.anacreon.fields.CompressedJSONField(null=True),
+        ),
+        migrations.RunPython(compress, migrations.RunPython.noop),
+        migrations.RenameField(
+            model_name='gamedata',
+            old_name='gameInfo',
+            new_name='gameInfoJSON',
+        ),
+        migrations.RenameField(
+            model_name='gamedata',
+            old_name='gameObjects',
+            new_name='gameObjectsJSON',
+        ),
+        # old columns are nullable while they are dropped, so this migration can be reversed
+        migrations.AlterField(
+            model_name='gamedata',
+            name='gameInfoJSON',
+            field=jsonfield.fields.JSONField(dump_kwargs={'cls': jsonfield.encoder.JSONEncoder, 'separators': (',', ':')}, load_kwargs={}, null=True),
+        ),
+        migrations.AlterField(
+            model_name='gamedata',
+            name='gameObjectsJSON',
+            field=jsonfield.fields.JSONField(dump_kwargs={'cls': jsonfield.encoder.JSONEncoder, 'separators': (',', ':')}, load_kwargs={}, null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, decompress),
+        migrations.RemoveField(
+            model_name='gamedata',
+            name='gameInfoJSON',
+        ),
+        migrations.RemoveField(
+            model_name='gamedata',
+            name='gameObjectsJSON',
+        ),
+        migrations.RenameField(
+            model_name='gamedata',
+            old_name='gameInfoCompressed',
+            new_name='gameInfo',
+        ),
+        migrations.RenameField(
+            model_name='gamedata',
+            old_name='gameObjectsCompressed',
+            new_name='gameObjects',
+        ),
+        migrations.AlterField(
+            model_name='gamedata',
+            name='gameInfo',
+            field=app.anacreon.fields.CompressedJSONField(),
+        ),
+        migrations.AlterField(
+            model_name='gamedata',
+            name='gameObjects',
+            field=app.anacreon.fields.CompressedJSONField(),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.1.14 on 2026-10-18 08:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anacreon', '0005_gamedata_compressed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeRouteSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('objID', models.PositiveIntegerField()),
+                ('partnerID', models.PositiveIntegerField()),
+                ('allocType', models.CharField(max_length=16)),
+                ('resourceID', models.PositiveIntegerField(null=True)),
+                ('allocation', models.FloatField(null=True)),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='route_snapshots', to='anacreon.gamedata')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ObjectSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('objID', models.PositiveIntegerField()),
+                ('objClass', models.CharField(max_length=32)),
+                ('sovereignID', models.PositiveIntegerField(null=True)),
+                ('designation', models.PositiveIntegerField(null=True)),
+                ('techLevel', models.PositiveSmallIntegerField(null=True)),
+                ('posX', models.FloatField(null=True)),
+                ('posY', models.FloatField(null=True)),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='object_snapshots', to='anacreon.gamedata')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='traderoutesnapshot',
+            index=models.Index(fields=['objID', 'timestamp'], name='anacreon_tr_objID_7c50e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traderoutesnapshot',
+            index=models.Index(fields=['partnerID', 'timestamp'], name='anacreon_tr_partner_d2dca4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traderoutesnapshot',
+            index=models.Index(fields=['resourceID', 'timestamp'], name='anacreon_tr_resourc_250362_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='objectsnapshot',
+            index=models.Index(fields=['objID', 'timestamp'], name='anacreon_ob_objID_8e0353_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='objectsnapshot',
+            index=models.Index(fields=['sovereignID', 'timestamp'], name='anacreon_ob_soverei_79b0b2_idx'),
+        ),
+    ]
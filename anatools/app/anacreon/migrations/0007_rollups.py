@@ -0,0 +1,62 @@
+# Generated by Django 3.1.14 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anacreon', '0006_object_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SovereignRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=8)),
+                ('bucket', models.DateTimeField()),
+                ('sovID', models.PositiveIntegerField()),
+                ('sovereignID', models.PositiveIntegerField(null=True)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('worlds', models.PositiveIntegerField(default=0)),
+                ('techLevels', models.PositiveIntegerField(default=0)),
+                ('maxTechLevel', models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('period', 'bucket', 'sovID', 'sovereignID')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourceRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=8)),
+                ('bucket', models.DateTimeField()),
+                ('sovID', models.PositiveIntegerField()),
+                ('sovereignID', models.PositiveIntegerField(null=True)),
+                ('resourceID', models.PositiveIntegerField()),
+                ('imports', models.FloatField(default=0)),
+                ('exports', models.FloatField(default=0)),
+                ('allocations', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('period', 'bucket', 'sovID', 'sovereignID', 'resourceID')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DesignationRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=8)),
+                ('bucket', models.DateTimeField()),
+                ('sovID', models.PositiveIntegerField()),
+                ('sovereignID', models.PositiveIntegerField(null=True)),
+                ('designation', models.PositiveIntegerField(null=True)),
+                ('worlds', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('period', 'bucket', 'sovID', 'sovereignID', 'designation')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anacreon', '0007_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='designationrollup',
+            name='gameID',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='gamedata',
+            name='gameID',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='resourcerollup',
+            name='gameID',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='sovereignrollup',
+            name='gameID',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='designationrollup',
+            unique_together={('period', 'bucket', 'gameID', 'sovID', 'sovereignID', 'designation')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='resourcerollup',
+            unique_together={('period', 'bucket', 'gameID', 'sovID', 'sovereignID', 'resourceID')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='sovereignrollup',
+            unique_together={('period', 'bucket', 'gameID', 'sovID', 'sovereignID')},
+        ),
+        migrations.AddIndex(
+            model_name='gamedata',
+            index=models.Index(fields=['gameID', 'sovID'], name='anacreon_ga_gameID_205bb9_idx'),
+        ),
+    ]
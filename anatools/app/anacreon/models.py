@@ -1,12 +1,191 @@
-import jsonfield
 from django.db import models
 from django.db.models import DateTimeField
 from django.utils import timezone
 from simple_history.models import HistoricalRecords
 
+from .delta import apply_info_delta, apply_objects_delta, diff_info, diff_objects
+from .fields import CompressedJSONField
+
+KEYFRAME_INTERVAL = 60  # full snapshot every hour with the default 1 min update interval
+
+
+class GameDataManager(models.Manager):
+    def __init__(self):
+        super().__init__()
+        self.last_full = {}  # (gameID, sovID) -> (id, gameInfo, gameObjects), saves rebuilding the chain every update
+
+    def create_snapshot(self, gameInfo: dict, gameObjects: list, sovID: int, gameID: int = None,
+                        keyframe_interval: int = KEYFRAME_INTERVAL, **kwargs):
+        # chains are kept per game and sovereign, the same sovereign id can be taken in several games
+        last = self.filter(gameID=gameID, sovID=sovID).order_by('-id').first()
+        keyframe = last and (last.keyframe if last.is_delta else last)
+
+        if not keyframe_interval or last is None or keyframe.deltas.count() + 1 >= keyframe_interval:
+            snapshot = self.create(gameInfo=gameInfo, gameObjects=gameObjects, sovID=sovID, gameID=gameID, **kwargs)
+        else:
+            cached = self.last_full.get((gameID, sovID))
+            if cached and cached[0] == last.id:
+                _, previous_info, previous_objects = cached
+            else:
+                previous_info, previous_objects = last.full_data()
+            snapshot = self.create(
+                gameInfo=diff_info(previous_info, gameInfo),
+                gameObjects=diff_objects(previous_objects, gameObjects),
+                sovID=sovID,
+                gameID=gameID,
+                is_delta=True,
+                keyframe=keyframe,
+                **kwargs
+            )
+
+        self.last_full[gameID, sovID] = (snapshot.id, gameInfo, gameObjects)
+        return snapshot
+
+    def of(self, gameID: int = None, sovID: int = None):
+        snapshots = self.all()
+        if gameID is not None:
+            snapshots = snapshots.filter(gameID=gameID)
+        if sovID is not None:
+            snapshots = snapshots.filter(sovID=sovID)
+        return snapshots
+
+    def snapshot_at(self, timestamp, sovID: int = None, gameID: int = None) -> 'GameData':
+        # latest snapshot taken at or before timestamp, with full gameInfo and gameObjects
+        snapshots = self.of(gameID, sovID).filter(timestamp__lte=timestamp)
+        snapshot = snapshots.order_by('-timestamp', '-id').first()
+        return snapshot and snapshot.full()
+
+    def iter_full(self, sovID: int = None, after_id: int = 0, chunk_size: int = 100, gameID: int = None,
+                  until_id: int = None):
+        # (snapshot, gameInfo, gameObjects) in id order, deltas are applied to the previous snapshot
+        # instead of rebuilding each of them from the keyframe
+        snapshots = self.of(gameID, sovID).filter(id__gt=after_id)
+        if until_id is not None:
+            snapshots = snapshots.filter(id__lte=until_id)
+
+        last = {}  # (gameID, sovID) -> (gameInfo, gameObjects)
+        for snapshot in snapshots.order_by('id').iterator(chunk_size=chunk_size):
+            if not snapshot.is_delta:
+                data = snapshot.gameInfo, snapshot.gameObjects
+            elif (snapshot.gameID, snapshot.sovID) in last:
+                game_info, game_objects = last[snapshot.gameID, snapshot.sovID]
+                data = (apply_info_delta(game_info, snapshot.gameInfo),
+                        apply_objects_delta(game_objects, snapshot.gameObjects))
+            else:
+                data = snapshot.full_data()
+            last[snapshot.gameID, snapshot.sovID] = data
+            yield (snapshot,) + data
+
 
 class GameData(models.Model):
-    gameInfo = jsonfield.JSONField()
-    gameObjects = jsonfield.JSONField()
+    # compressed, parsed only when accessed
+    gameInfo = CompressedJSONField()
+    gameObjects = CompressedJSONField()
     sovID = models.PositiveIntegerField()
+    gameID = models.PositiveIntegerField(null=True)  # none for snapshots collected before games were told apart
     timestamp = DateTimeField(default=timezone.now)
+
+    # delta rows store only changes since the previous snapshot of the same game and sovereign
+    is_delta = models.BooleanField(default=False)
+    keyframe = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='deltas')
+
+    objects = GameDataManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['gameID', 'sovID'])]
+
+    def full_data(self) -> tuple:
+        if not self.is_delta:
+            return self.gameInfo, self.gameObjects
+
+        game_info, game_objects = self.keyframe.gameInfo, self.keyframe.gameObjects
+        for delta in self.keyframe.deltas.filter(id__lte=self.id).order_by('id'):
+            game_info = apply_info_delta(game_info, delta.gameInfo)
+            game_objects = apply_objects_delta(game_objects, delta.gameObjects)
+        return game_info, game_objects
+
+    def full(self) -> 'GameData':
+        # unsaved copy of this snapshot with deltas applied
+        game_info, game_objects = self.full_data()
+        return GameData(id=self.id, gameInfo=game_info, gameObjects=game_objects, sovID=self.sovID,
+                        gameID=self.gameID, timestamp=self.timestamp)
+
+
+class ObjectSnapshot(models.Model):
+    # one row per object per snapshot, for time series queries without parsing blobs
+    snapshot = models.ForeignKey(GameData, on_delete=models.CASCADE, related_name='object_snapshots')
+    timestamp = DateTimeField()
+    objID = models.PositiveIntegerField()
+    objClass = models.CharField(max_length=32)
+    sovereignID = models.PositiveIntegerField(null=True)
+    designation = models.PositiveIntegerField(null=True)
+    techLevel = models.PositiveSmallIntegerField(null=True)
+    posX = models.FloatField(null=True)
+    posY = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['objID', 'timestamp']),
+            models.Index(fields=['sovereignID', 'timestamp']),
+        ]
+
+
+class TradeRouteSnapshot(models.Model):
+    # one row per route allocation, taken from the world that owns route data
+    snapshot = models.ForeignKey(GameData, on_delete=models.CASCADE, related_name='route_snapshots')
+    timestamp = DateTimeField()
+    objID = models.PositiveIntegerField()
+    partnerID = models.PositiveIntegerField()
+    allocType = models.CharField(max_length=16)  # imports, exports, importTech or exportTech
+    resourceID = models.PositiveIntegerField(null=True)  # none for tech
+    allocation = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['objID', 'timestamp']),
+            models.Index(fields=['partnerID', 'timestamp']),
+            models.Index(fields=['resourceID', 'timestamp']),
+        ]
+
+
+class Rollup(models.Model):
+    # Totals of all snapshots of one game and sovereign (gameID and sovID, like in GameData)
+    # that fall into one bucket.
+    # Average over the bucket is a total divided by samples of the matching SovereignRollup.
+    period = models.CharField(max_length=8)  # hour or day
+    bucket = DateTimeField()  # start of the period
+    sovID = models.PositiveIntegerField()
+    gameID = models.PositiveIntegerField(null=True)
+    sovereignID = models.PositiveIntegerField(null=True)  # owner of the worlds
+
+    class Meta:
+        abstract = True
+
+
+class SovereignRollup(Rollup):
+    samples = models.PositiveIntegerField(default=0)  # snapshots where sovereign had worlds
+    worlds = models.PositiveIntegerField(default=0)
+    techLevels = models.PositiveIntegerField(default=0)
+    maxTechLevel = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['period', 'bucket', 'gameID', 'sovID', 'sovereignID']
+
+
+class DesignationRollup(Rollup):
+    designation = models.PositiveIntegerField(null=True)
+    worlds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['period', 'bucket', 'gameID', 'sovID', 'sovereignID', 'designation']
+
+
+class ResourceRollup(Rollup):
+    # allocations of routes owned by the sovereign worlds, see TradeRouteSnapshot
+    resourceID = models.PositiveIntegerField()
+    imports = models.FloatField(default=0)
+    exports = models.FloatField(default=0)
+    allocations = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['period', 'bucket', 'gameID', 'sovID', 'sovereignID', 'resourceID']
@@ -0,0 +1,52 @@
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from .rollups import bucket_start
+
+KEEP_ALL = timedelta(hours=24)  # every snapshot is kept
+KEEP_HOURLY = timedelta(days=30)  # one snapshot per hour is kept, one per day after that
+
+Row = namedtuple('Row', 'id gameID sovID timestamp is_delta keyframe_id')
+
+# snapshots of one chain (keyframe and its deltas) to delete, and kept deltas to rewrite as full snapshots
+# because deltas before them are deleted
+ChainCompaction = namedtuple('ChainCompaction', 'keyframe_id drop materialize')
+
+
+def retention_period(timestamp, now, keep_all: timedelta = KEEP_ALL, keep_hourly: timedelta = KEEP_HOURLY):
+    if timestamp >= now - keep_all:
+        return None
+    return 'hour' if timestamp >= now - keep_hourly else 'day'
+
+
+def plan_compaction(rows, now, keep_all: timedelta = KEEP_ALL, keep_hourly: timedelta = KEEP_HOURLY) -> list:
+    # Rows are Row tuples of all snapshots in id order. Only chains that are older than keep_all as a whole
+    # are compacted, and never the last chain of a game and sovereign: collectors add new deltas to it.
+    chains = defaultdict(list)  # keyframe id -> rows
+    last_chain = {}  # (gameID, sovID) -> keyframe id
+    for row in rows:
+        keyframe_id = row.keyframe_id if row.is_delta else row.id
+        chains[keyframe_id].append(row)
+        last_chain[row.gameID, row.sovID] = keyframe_id
+
+    active = set(last_chain.values())
+    chains = {k: v for k, v in chains.items()
+              if k not in active and retention_period(v[-1].timestamp, now, keep_all, keep_hourly)}
+
+    # one snapshot per game, sovereign and bucket is kept, full ones are preferred so nothing has to be rewritten
+    keep = {}  # (gameID, sovID, period, bucket) -> row
+    for row in (x for chain in chains.values() for x in chain):
+        period = retention_period(row.timestamp, now, keep_all, keep_hourly)
+        key = row.gameID, row.sovID, period, bucket_start(row.timestamp, period)
+        if key not in keep or (keep[key].is_delta, keep[key].id) > (row.is_delta, row.id):
+            keep[key] = row
+    keep_ids = {x.id for x in keep.values()}
+
+    result = []
+    for keyframe_id, chain in sorted(chains.items()):
+        drop = [x.id for x in chain if x.id not in keep_ids]
+        if not drop:
+            continue
+        materialize = [x.id for x in chain if x.id in keep_ids and x.is_delta and x.id > drop[0]]
+        result.append(ChainCompaction(keyframe_id, drop, materialize))
+    return result
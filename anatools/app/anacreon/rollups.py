@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+from .models import DesignationRollup, GameData, ResourceRollup, SovereignRollup
+from .snapshots import BATCH_SIZE, allocations
+
+PERIODS = ('hour', 'day')
+
+# model -> (key fields after the common ones, value fields)
+ROLLUPS = {
+    SovereignRollup: ((), ('samples', 'worlds', 'techLevels', 'maxTechLevel')),
+    DesignationRollup: (('designation',), ('worlds',)),
+    ResourceRollup: (('resourceID',), ('imports', 'exports', 'allocations')),
+}
+MAX_FIELDS = {'maxTechLevel'}  # combined by max instead of sum
+
+
+def bucket_start(timestamp, period: str):
+    timestamp = timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0) if period == 'day' else timestamp
+
+
+def snapshot_totals(game_objects: list) -> dict:
+    # model -> {(sovereignID, *key): [values]} of one snapshot
+    sovereigns = defaultdict(lambda: [1, 0, 0, 0])
+    designations = defaultdict(lambda: [0])
+    resources = defaultdict(lambda: [0, 0, 0])
+
+    owners = {}
+    for obj in game_objects:
+        if not isinstance(obj, dict) or obj.get('class') != 'world':
+            continue
+        owners[obj['id']] = sovereign = obj.get('sovereignID')
+        tech = obj.get('techLevel') or 0
+        totals = sovereigns[(sovereign,)]
+        totals[1] += 1
+        totals[2] += tech
+        totals[3] = max(totals[3], tech)
+        designations[sovereign, obj.get('designation')][0] += 1
+
+    for obj, partner_id, alloc_type, resource, allocation in allocations(game_objects):
+        if alloc_type not in ('imports', 'exports') or obj.get('id') not in owners:
+            continue
+        totals = resources[owners[obj['id']], resource]
+        totals[0 if alloc_type == 'imports' else 1] += allocation or 0
+        totals[2] += 1
+
+    return {SovereignRollup: sovereigns, DesignationRollup: designations, ResourceRollup: resources}
+
+
+class RollupBatch:
+    # Totals of several snapshots merged in memory, then written with one read and
+    # bulk update/create per table and bucket. Cost depends on number of buckets, not snapshots.
+    def __init__(self):
+        # model -> (period, bucket, gameID, sovID) -> key -> values
+        self.totals = {x: defaultdict(dict) for x in ROLLUPS}
+        self.snapshots = 0
+
+    def __len__(self):
+        return self.snapshots
+
+    def add(self, snapshot: GameData, game_objects: list):
+        for model, rows in snapshot_totals(game_objects).items():
+            value_fields = ROLLUPS[model][1]
+            for period in PERIODS:
+                bucket = self.totals[model][period, bucket_start(snapshot.timestamp, period), snapshot.gameID,
+                                             snapshot.sovID]
+                for key, values in rows.items():
+                    bucket[key] = combine(value_fields, bucket[key], values) if key in bucket else list(values)
+        self.snapshots += 1
+
+    def flush(self, batch_size: int = BATCH_SIZE):
+        # call inside a transaction, together with writing the snapshots
+        for model, buckets in self.totals.items():
+            key_fields, value_fields = ROLLUPS[model]
+            key_fields = ('sovereignID',) + key_fields
+            for (period, bucket, game_id, sov_id), rows in buckets.items():
+                rows_of_bucket = model.objects.filter(period=period, bucket=bucket, gameID=game_id, sovID=sov_id)
+                existing = {tuple(getattr(x, f) for f in key_fields): x for x in rows_of_bucket}
+                created, updated = [], []
+                for key, values in rows.items():
+                    row = existing.get(key)
+                    if row is None:
+                        row = model(period=period, bucket=bucket, gameID=game_id, sovID=sov_id,
+                                    **dict(zip(key_fields, key)))
+                        created.append(row)
+                    else:
+                        values = combine(value_fields, [getattr(row, f) for f in value_fields], values)
+                        updated.append(row)
+                    for field, value in zip(value_fields, values):
+                        setattr(row, field, value)
+                model.objects.bulk_create(created, batch_size=batch_size)
+                model.objects.bulk_update(updated, value_fields, batch_size=batch_size)
+        self.totals = {x: defaultdict(dict) for x in ROLLUPS}
+        self.snapshots = 0
+
+
+def combine(fields: tuple, a: list, b: list) -> list:
+    return [max(x, y) if field in MAX_FIELDS else x + y for field, x, y in zip(fields, a, b)]
+
+
+def record_rollups(snapshot: GameData, game_objects: list):
+    batch = RollupBatch()
+    batch.add(snapshot, game_objects)
+    batch.flush()
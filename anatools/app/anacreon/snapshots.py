@@ -0,0 +1,52 @@
+from .models import GameData, ObjectSnapshot, TradeRouteSnapshot
+
+BATCH_SIZE = 1000
+
+
+def object_rows(snapshot: GameData, game_objects: list):
+    for obj in game_objects:
+        if not isinstance(obj, dict) or 'id' not in obj or 'class' not in obj:
+            continue  # sequence updates and other service objects
+        pos = obj.get('pos') or (None, None)
+        yield ObjectSnapshot(
+            snapshot=snapshot,
+            timestamp=snapshot.timestamp,
+            objID=obj['id'],
+            objClass=obj['class'],
+            sovereignID=obj.get('sovereignID'),
+            designation=obj.get('designation'),
+            techLevel=obj.get('techLevel'),
+            posX=pos[0],
+            posY=pos[1],
+        )
+
+
+def allocations(game_objects: list):
+    # (object, partner id, alloc type, resource id, allocation) of every route, from the side that owns its data
+    for obj in game_objects:
+        if not isinstance(obj, dict):
+            continue
+        for route in obj.get('tradeRoutes', []):
+            if 'return' in route.keys():
+                continue  # data for this route belongs to the partner
+
+            for alloc_type in ('imports', 'exports'):
+                data = route.get(alloc_type, [])
+                for i in range(0, len(data) - 3, 4):  # [resourceID, allocation, ?, ?] groups
+                    yield obj, route['partnerObjID'], alloc_type, data[i], data[i + 1]
+            for alloc_type in ('importTech', 'exportTech'):
+                if route.get(alloc_type):
+                    yield obj, route['partnerObjID'], alloc_type, None, route[alloc_type][0]
+
+
+def route_rows(snapshot: GameData, game_objects: list):
+    for obj, partner_id, alloc_type, resource, allocation in allocations(game_objects):
+        yield TradeRouteSnapshot(snapshot=snapshot, timestamp=snapshot.timestamp, objID=obj['id'],
+                                 partnerID=partner_id, allocType=alloc_type, resourceID=resource,
+                                 allocation=allocation)
+
+
+def record_snapshot(snapshot: GameData, game_objects: list, batch_size: int = BATCH_SIZE):
+    # game_objects are full objects of the snapshot, delta rows don't have them
+    ObjectSnapshot.objects.bulk_create(object_rows(snapshot, game_objects), batch_size=batch_size)
+    TradeRouteSnapshot.objects.bulk_create(route_rows(snapshot, game_objects), batch_size=batch_size)
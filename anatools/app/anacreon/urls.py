@@ -4,4 +4,7 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('api/snapshots/latest/', views.snapshot_latest, name='snapshot-latest'),
+    path('api/worlds/<int:obj_id>/history/', views.world_history, name='world-history'),
+    path('api/routes/', views.route_list, name='route-list'),
 ]
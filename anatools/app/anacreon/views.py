@@ -1,5 +1,179 @@
-from django.http import HttpResponse
+import json
+
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import condition, require_GET
+
+from .models import GameData, ObjectSnapshot, TradeRouteSnapshot
+
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+CHUNK_SIZE = 100  # items encoded into one streamed chunk
 
 
 def index(request):
     return HttpResponse("Anacreon app index")
+
+
+class BadRequest(Exception):
+    pass
+
+
+def int_param(request, name: str, default=None, maximum: int = None, minimum: int = None):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest('%s should be an integer' % name)
+    if minimum is not None and value < minimum:
+        raise BadRequest('%s should be at least %d' % (name, minimum))
+    return min(value, maximum) if maximum else value
+
+
+def bad_request_as_400(view):
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return HttpResponseBadRequest(str(e))
+    return wrapper
+
+
+def stream_json(data: dict, key: str, items: list) -> StreamingHttpResponse:
+    # data goes first, then the list under key is encoded in chunks, so a big response isn't built in memory
+    def chunks():
+        head = json.dumps(data)
+        yield head[:-1] + (', ' if data else '') + json.dumps(key) + ': ['
+        for i in range(0, len(items), CHUNK_SIZE):
+            yield (', ' if i else '') + ', '.join(json.dumps(x) for x in items[i:i + CHUNK_SIZE])
+        yield ']}'
+    return StreamingHttpResponse(chunks(), content_type='application/json')
+
+
+# ETag and Last-Modified come from the id and timestamp of the newest snapshot a response is built from,
+# so polling clients get 304 until the next update is collected
+
+def latest_snapshot(request, **kwargs) -> dict:
+    if not hasattr(request, 'latest_snapshot'):
+        snapshots = GameData.objects.of(int_param(request, 'game'), int_param(request, 'sov'))
+        request.latest_snapshot = snapshots.order_by('-id').values('id', 'timestamp').first()
+    return request.latest_snapshot
+
+
+def world_rows(request, obj_id: int):
+    # object ids are unique within a game only, ?game=<game id> to pick one
+    rows = ObjectSnapshot.objects.filter(objID=obj_id)
+    game_id = int_param(request, 'game')
+    return rows if game_id is None else rows.filter(snapshot__gameID=game_id)
+
+
+def world_snapshot(request, obj_id: int, **kwargs) -> dict:
+    if not hasattr(request, 'latest_snapshot'):
+        row = world_rows(request, obj_id).order_by('-timestamp').values('snapshot_id', 'timestamp').first()
+        request.latest_snapshot = row and {'id': row['snapshot_id'], 'timestamp': row['timestamp']}
+    return request.latest_snapshot
+
+
+def routes_snapshot(request, **kwargs) -> dict:
+    if not hasattr(request, 'latest_snapshot'):
+        snapshot_id = int_param(request, 'snapshot')
+        if snapshot_id is None:
+            return latest_snapshot(request)
+        request.latest_snapshot = GameData.objects.filter(id=snapshot_id).values('id', 'timestamp').first()
+    return request.latest_snapshot
+
+
+def etag(get_snapshot):
+    def func(request, *args, **kwargs):
+        try:
+            snapshot = get_snapshot(request, *args, **kwargs)
+        except BadRequest:
+            return None
+        return snapshot and '"snapshot-%d"' % snapshot['id']
+    return func
+
+
+def last_modified(get_snapshot):
+    def func(request, *args, **kwargs):
+        try:
+            snapshot = get_snapshot(request, *args, **kwargs)
+        except BadRequest:
+            return None
+        return snapshot and snapshot['timestamp']
+    return func
+
+
+@require_GET
+@bad_request_as_400
+@condition(etag_func=etag(latest_snapshot), last_modified_func=last_modified(latest_snapshot))
+def snapshot_latest(request):
+    # full game state of the newest snapshot, ?game=<game id>&sov=<sovereign id> to pick the collecting sovereign
+    latest = latest_snapshot(request)
+    if latest is None:
+        raise Http404('No snapshots yet')
+
+    snapshot = GameData.objects.get(id=latest['id'])
+    game_info, game_objects = snapshot.full_data()
+    data = {
+        'id': snapshot.id,
+        'gameID': snapshot.gameID,
+        'sovID': snapshot.sovID,
+        'timestamp': snapshot.timestamp.isoformat(),
+    }
+    if request.GET.get('info') != '0':
+        data['gameInfo'] = game_info
+    return stream_json(data, 'gameObjects', game_objects)
+
+
+def page(rows, request) -> tuple:
+    # keyset pagination by row id: ?after=<next of the previous page>&limit=<page size>
+    after = int_param(request, 'after', 0)
+    limit = int_param(request, 'limit', PAGE_SIZE, MAX_PAGE_SIZE, minimum=1)
+    rows = list(rows.filter(id__gt=after).order_by('id')[:limit])
+    return rows, (rows[-1]['id'] if len(rows) == limit else None)
+
+
+@require_GET
+@bad_request_as_400
+@condition(etag_func=etag(world_snapshot), last_modified_func=last_modified(world_snapshot))
+def world_history(request, obj_id: int):
+    # one world over time, from the normalized table, blobs aren't touched
+    if world_snapshot(request, obj_id) is None:
+        raise Http404('Unknown object %d' % obj_id)
+
+    rows = world_rows(request, obj_id)
+    if request.GET.get('since'):
+        since = parse_datetime(request.GET['since'])
+        if since is None:
+            raise BadRequest('since should be an ISO 8601 date and time')
+        rows = rows.filter(timestamp__gte=since)
+    rows, after = page(rows.values('id', 'snapshot_id', 'timestamp', 'sovereignID', 'designation', 'techLevel',
+                                   'posX', 'posY'), request)
+    for x in rows:
+        x['timestamp'] = x['timestamp'].isoformat()
+    return stream_json({'objID': obj_id, 'next': after}, 'results', rows)
+
+
+@require_GET
+@bad_request_as_400
+@condition(etag_func=etag(routes_snapshot), last_modified_func=last_modified(routes_snapshot))
+def route_list(request):
+    # route allocations of one snapshot (latest by default), ?sovereign=<id>&resource=<id> filters
+    snapshot = routes_snapshot(request)
+    if snapshot is None:
+        raise Http404('No such snapshot')
+
+    rows = TradeRouteSnapshot.objects.filter(snapshot_id=snapshot['id'])
+    sovereign = int_param(request, 'sovereign')
+    if sovereign is not None:
+        rows = rows.filter(objID__in=ObjectSnapshot.objects.filter(snapshot_id=snapshot['id'], sovereignID=sovereign)
+                           .values('objID'))
+    resource = int_param(request, 'resource')
+    if resource is not None:
+        rows = rows.filter(resourceID=resource)
+
+    rows, after = page(rows.values('id', 'objID', 'partnerID', 'allocType', 'resourceID', 'allocation'), request)
+    return stream_json({'snapshot': snapshot['id'], 'timestamp': snapshot['timestamp'].isoformat(), 'next': after},
+                       'results', rows)
@@ -1,9 +1,27 @@
-import itertools
+import argparse
 import json
 import os
+from collections import namedtuple
 
 from lib.anacreonlib import anacreon
 from lib.anacreonlib.anacreon import Anacreon
+from lib.client import get_objects_since, install_session, pooled_session
+from lib.metrics import Metrics, profiled
+from lib.sync import ObjectStore
+from planner.assign import optimize as optimize_assignment
+from planner.catalog import ScenarioCatalog
+from planner.replay import ReplayApi
+from planner.scenario_cache import ScenarioCache
+from planner.routes import RouteIndex
+from planner.runner import run_targets
+from planner.fingerprint import PlanCache, hub_supply, neighbourhood_fingerprint, world_fingerprint
+from planner.journal import MutationJournal, reconcile
+from planner.model import Galaxy, World
+from planner.plan import RoutePlan, apply, diff, print_plan
+from planner.scheduler import (PRIORITY_EXPORT, PRIORITY_IMPORT, PRIORITY_PROPAGATION, PRIORITY_RESUME, PRIORITY_TECH,
+                               SET_TRADE_ROUTE, STOP_TRADE_ROUTE, Budget, MutationScheduler)
+from planner.spatial import ADMIN_RANGE, TRADE_RANGE, build_index
+from planner.supply import SupplyIndex
 
 
 class SkipWorldException(Exception):
@@ -19,164 +37,214 @@ def counter(func):
     return wrapper
 
 
-def main():
-    def what_world_needs(world: dict) -> set:
-        # base needs
-        base_needs = {x for x in world['baseConsumption'][::3]}
-        print('\nBase consumption:', [api.scenario_info[x]['nameDesc'] for x in base_needs])
-
-        # world industries needs
-        resources_by_trait = [x['productionData'] for x in world['traits']
-                              if type(x) is dict and 'productionData' in x.keys()]
-        resources = list(itertools.chain(*resources_by_trait))  # flat list of resources data
-        production_needs = {res for i, res in enumerate(resources[::3])
-                            if resources[i*3+1] < 0}  # quantity produced flag, negative means consumed
-        print('Production needs:', [api.scenario_info[x]['nameDesc'] for x in production_needs])
-
-        # combined needs, ignoring life support goods
-        return base_needs | production_needs - life_support_goods
-
-    def what_world_offers(world: dict) -> set:
-        primary_trait = next((x for x in world['traits'] if type(x) is dict and x.get('isPrimary', None)), {})
-        build_data = primary_trait.get('buildData', [])
-        primary_resources = {res for i, res in enumerate(build_data[::3])
-                             if not build_data[i*3+2]  # cannotBuild flag
-                             and api.scenario_info[res]['category'] == 'commodity'}  # filter out units
-        return primary_resources
-
-    def what_world_imports(world: dict, ignore_hubs=False) -> set:
-        imports = set()
-        for route in world.get('tradeRoutes', []):
-            partner = api.get_obj_by_id(route['partnerObjID'])
-            designation = api.scenario_info[partner['designation']]
-            if ignore_hubs and designation['unid'] == 'core.tradingHubDesignation':
-                continue
-
-            if 'return' in route.keys():  # The data for this route belongs to another world
-                route = next(r for r in partner['tradeRoutes'] if r['partnerObjID'] == world['id'])
-                imports.update(route.get('exports', [])[::4])
-            else:
-                imports.update(route.get('imports', [])[::4])
-        return imports
-
-    def world_exporters_by_resource(world: dict, resource: int) -> list:
-        exporters = []
-        for route in world.get('tradeRoutes', []):
-            if 'return' in route.keys():  # The data for this route belongs to another world
-                partner = api.get_obj_by_id(route['partnerObjID'])
-                route = next(r for r in partner['tradeRoutes'] if r['partnerObjID'] == world['id'])
-                if resource in route.get('exports', [])[::4]:
-                    exporters.append(partner['id'])
-            else:
-                if resource in route.get('imports', [])[::4]:
-                    exporters.append(route['partnerObjID'])
-        return [api.get_obj_by_id(x) for x in exporters]
-
-    def is_route_present(world: dict, partner: dict, alloc_type: str, alloc_value: float = None,
-                         res_type: int = None) -> bool:
-        try:
-            route = next((x for x in world['tradeRoutes'] if x['partnerObjID'] == partner['id']))
-            if 'return' in route.keys():  # The data for this route belongs to another world
-                route = next(r for r in partner['tradeRoutes'] if r['partnerObjID'] == world['id'])
-                alloc_type = 'exports' if alloc_type == 'imports' else 'imports' if alloc_type == 'exports' else alloc_type
-                # TODO: alloc_type = 'exportTech' if alloc_type = 'importTech'
-            data = route[alloc_type]
-            for i, resource in enumerate(data[::4]):
-                if resource == res_type and int(data[i*4+1]) == alloc_value:
-                    return True
-        except (KeyError, StopIteration):
-            pass  # there is no route between these worlds
-        return False
-
-    # def should_create_import_route(world: dict, partner: dict, alloc_value: float = None,
-    #                                res_type: int = None) -> bool:
-    #     return can_export(partner, res_type) and not is_route_present(world, partner, )
-
-    def in_trade_range(world: dict, objects: list) -> list:
-        pass
-
-    def is_in_admin_range(world: dict) -> bool:
+# files that keep planner state between runs and its metrics, None disables one of them
+StateFiles = namedtuple('StateFiles', 'budget plan scenario objects journal metrics prometheus')
+
+# planned mutations, mutations left for the next run, requests sent by endpoint and metrics report
+RunResult = namedtuple('RunResult', 'mutations deferred requests metrics')
+
+
+def state_files(suffix: str = '') -> StateFiles:
+    # suffix keeps files of different targets apart, see planner.runner
+    def path(env: str, default: str = None) -> str:
+        if not os.environ.get(env, default):
+            return None
+        root, ext = os.path.splitext(os.environ.get(env, default))
+        return root + suffix + ext
+
+    return StateFiles(
+        budget=path('BUDGET_FILE', 'trade_routes_budget.json'),
+        plan=path('PLAN_CACHE_FILE', 'trade_routes_plan.json'),
+        scenario=path('SCENARIO_CACHE_FILE', 'trade_routes_scenario.pickle'),
+        objects=path('OBJECT_STORE_FILE', 'trade_routes_objects.pickle'),
+        journal=path('JOURNAL_FILE', 'trade_routes_journal.jsonl'),
+        metrics=path('METRICS_FILE', 'trade_routes_metrics.json'),
+        prometheus=path('METRICS_PROM_FILE'),  # e.g. into node_exporter textfile collector directory
+    )
+
+
+def connect(login: str, password: str, game_id, metrics: Metrics = None) -> Anacreon:
+    # requests go through one keep-alive session, metrics measure every one of them, login included
+    session = pooled_session()
+    if metrics is not None:
+        metrics.attach(session)
+    install_session(session)
+    api = Anacreon(login, password)
+    api.gameID = game_id
+    return api
+
+
+def run(api, files: StateFiles, dry_run: bool = False, full: bool = False, refresh_scenario: bool = False,
+        incremental: bool = False, optimize: bool = False, hub_capacity: int = None,
+        metrics: Metrics = None, login: str = None) -> RunResult:
+    def what_world_needs(world: World) -> set:
+        print('\nBase consumption:', catalog.names(world.base_needs))
+        print('Production needs:', catalog.names(world.production_needs))
+        return set(world.needs)
+
+    def what_world_offers(world: World) -> set:
+        return set(world.offers)
+
+    def fetch_scenario() -> ScenarioCatalog:
+        api.get_game_list()
+        gameInfo = api.get_game_info()
+        api.sovID = gameInfo['userInfo']['sovereignID']
+        return scenario_cache.put(login, api.gameID, api.sovID, api.scenario_info)
+
+    def is_in_admin_range(world: World) -> bool:
         if not caps:
             return False
 
-        admin_range = 250
-        capitals = sorted(caps, key=lambda x: api.dist(x['pos'], world['pos']))
-        print('\nCapitals distance:')
-        for cap in capitals:
-            print('%s: %.2f' % (cap['name'], api.dist(cap['pos'], world['pos'])))
+        cap = caps_index.nearest(world.pos)[0]
+        print('\nClosest capital:', cap.name)
 
-        cap = capitals[0]
-        print('\nClosest capital:', cap['name'])
-
-        caps_in_range = [x for x in capitals if api.dist(x['pos'], world['pos']) <= admin_range]
-        print('\nCaps in range: %s' % [x['name'] for x in caps_in_range])
+        caps_in_range = caps_index.within(world.pos, ADMIN_RANGE)
+        print('\nCaps in range: %s' % ['%s (%.2f)' % (x.name, api.dist(x.pos, world.pos))
+                                      for x in caps_in_range])
         if caps_in_range:
             print('%s belongs to cap %s (distance %.2f)' %
-                  (world['name'], cap['name'], api.dist(cap['pos'], world['pos'])))
+                  (world.name, cap.name, api.dist(cap.pos, world.pos)))
         return bool(caps_in_range)  # true if list isn't empty
 
-    print(os.environ.get('PYTHONPATH'))
-    print(os.environ.get("LOGIN"), os.environ.get("PASSWORD"))
-    # TODO: use ANACREON_LOGIN and ANACREON_PASSWORD names to avoid possible conflicts
-    api = Anacreon(os.environ.get("LOGIN"), os.environ.get("PASSWORD"))
+    def finish(mutations: list, deferred: list, requests: dict) -> RunResult:
+        metrics.phase(None)
+        metrics.print_summary()
+        metrics.save(files.metrics, files.prometheus)
+        return RunResult(mutations, deferred, requests, metrics.report())
+
+    metrics = metrics or Metrics('planner')
+    metrics.start_run()
+    metrics.phase('fetch')
 
     # set decorator to count requests
     api.set_trade_route = counter(api.set_trade_route)
     api.stop_trade_route = counter(api.stop_trade_route)
 
-    api.gameID = os.environ.get("GAME_ID")
-
-    gameList = api.get_game_list()
-    gameInfo = api.get_game_info()
-    api.sovID = gameInfo['userInfo']['sovereignID']
-    gameObjects = api.get_objects()
-
-    my_worlds = [x for x in api.objects_dict.values()
-                 if x['sovereignID'] == api.sovID and x['class'] == 'world']
-    hubs = [x for x in my_worlds if api.scenario_info[x['designation']]['unid'] == 'core.tradingHubDesignation']
-    fonds = [x for x in my_worlds if api.scenario_info[x['designation']]['unid'] == 'core.universityDesignation']
-    caps = [x for x in my_worlds
-            if api.scenario_info[x['designation']].get('role', None) in ('sectorCapital', 'imperialCapital')
-            and 'buildComplete' not in x]  # not having a buildComplete date means thing is already built
-
-    life_support_goods = {
-        next(x['id'] for x in api.scenario_info.values() if x.get('unid') == 'core.airFilters'),
-        next(x['id'] for x in api.scenario_info.values() if x.get('unid') == 'core.radiationMeds'),
-        next(x['id'] for x in api.scenario_info.values() if x.get('unid') == 'core.radiationShielding'),
-        next(x['id'] for x in api.scenario_info.values() if x.get('unid') == 'core.lifeSupportSupplies'),
-    }
-
-    correct_routes = set()
+    # all mutations go through the scheduler, it keeps us under the server rate limit,
+    # journal keeps track of them on disk, so an interrupted run can be finished by the next one
+    budget = Budget(files.budget)
+    journal = MutationJournal(files.journal) if files.journal else None
+    scheduler = MutationScheduler(api, budget, errors=(anacreon.HexArcException,), journal=journal)
+
+    # routes index holds current state and follows applied mutations,
+    # supply index also follows planned routes, so planning decisions see them
+    routes = RouteIndex()
+    supply = SupplyIndex()
+    plan = RoutePlan()
+    scheduler.set_listeners.append(routes.apply_set)
+    scheduler.stop_listeners.append(routes.apply_stop)
+    plan.set_listeners.append(supply.apply_set)
+
+    # scenario is taken from the disk cache when possible, so the only request at startup is getObjects
+    scenario_cache = ScenarioCache(files.scenario)
+    cached = None if refresh_scenario else scenario_cache.get(login, api.gameID)
+    if cached:
+        print('Using cached scenario %s' % cached['hash'][:8])
+        api.sovID = cached['sov_id']
+        catalog = cached['catalog']
+        api.scenario_info = catalog.info
+    else:
+        catalog = fetch_scenario()
+    if incremental and files.objects:
+        # objects of the last run are kept on disk, only changes since its update sequence are requested
+        store_path = files.objects
+        store = ObjectStore.load(store_path)
+        gameObjects = store.sync((api.gameID, api.sovID), api.get_objects,
+                                 lambda x: get_objects_since(api, x, anacreon.requests))
+        api.objects_dict = store.objects
+        store.save(store_path)
+        print('Objects: %s' % ('full fetch' if store.last_changed is None else
+                               '%d changed of %d' % (store.last_changed, len(store))))
+    else:
+        gameObjects = api.get_objects()
+    if cached and catalog.unknown(gameObjects):
+        print('Cached scenario is outdated, fetching it again')
+        catalog = fetch_scenario()
+    metrics.phase('classification')
+    routes.build(api.objects_dict)
+
+    # groups that the previous run didn't finish go first, planning starts from the state they were meant to make,
+    # cleanup leaves routes they create alone
+    resumed, finished = reconcile(journal, routes) if journal else ([], [])
+    for x in resumed:
+        print('Resuming interrupted mutation: %s (%d of %d calls left)' % (
+            x.description, len(x.calls), len(x.calls) + x.offset))
+        scheduler.submit(PRIORITY_RESUME, x.calls, x.description, x.group, x.offset)
+        for method, *args in x.calls:
+            if method == SET_TRADE_ROUTE:
+                plan.keep_route(args[0], args[1])
+    galaxy = Galaxy(api.objects_dict.values(), catalog, api.sovID)  # decoded worlds, raw dicts are parsed only here
+
+    my_worlds = galaxy.owned_by(api.sovID)
+    hubs = [x for x in my_worlds if x.is_hub]
+    fonds = [x for x in my_worlds if x.is_university]
+    caps = [x for x in my_worlds if x.is_capital and x.is_built]
+
+    # spatial indexes are built once, worlds don't move during the run
+    backend = os.environ.get('SPATIAL_BACKEND', 'grid')
+    hubs_index = build_index(hubs, backend, cell_size=TRADE_RANGE)
+    fonds_index = build_index(fonds, backend, cell_size=TRADE_RANGE)
+    caps_index = build_index(caps, backend, cell_size=ADMIN_RANGE)
 
     print('\nMy worlds: %s' % len(my_worlds))
-    print("\nHubs: %s" % [x['name'] for x in hubs])
-    print("Foundations: %s" % [x['name'] for x in fonds])
-    print("Capitals: %s" % [x['name'] for x in caps])
+    print("\nHubs: %s" % [x.name for x in hubs])
+    print("Foundations: %s" % [x.name for x in fonds])
+    print("Capitals: %s" % [x.name for x in caps])
     print('\n')
     # world = my_worlds[0]
 
     # calc initial imports for hubs
-    for hub in hubs:
-        hub['can_export'] = what_world_imports(hub, ignore_hubs=True)  # everything that we get from producer worlds
-
+    supply.build(routes, {x.id for x in hubs})
+    hub_exports = {x.id: supply.can_export(x.id) for x in hubs}  # everything that we get from producer worlds
+
+    # worlds that didn't change since the last run reuse their planned allocations,
+    # they are replayed first, so supply index knows about them when other worlds are planned
+    cache = PlanCache(files.plan)
+    if full or optimize:  # optimizer chooses partners for all worlds at once
+        cache.worlds.clear()
+    neighbourhood = neighbourhood_fingerprint(hubs, fonds, caps)
+    fingerprints = {x.id: world_fingerprint(api.objects_dict[x.id], routes, hub_supply(
+        hubs_index.within(x.pos, x.trade_distance), supply, x.offers))
+        for x in my_worlds}
+    changed_worlds = []
     for world in my_worlds:
+        if cache.is_fresh(world.id, fingerprints[world.id], neighbourhood):
+            cache.replay(world.id, plan)
+            cache.store(world.id, fingerprints[world.id], plan)
+        else:
+            changed_worlds.append(world)
+    print('Worlds to plan: %d changed, %d unchanged' %
+          (len(changed_worlds), len(my_worlds) - len(changed_worlds)))
+
+    # optimizer picks hub and fond of every world, instead of the closest ones
+    assignment = None
+    if optimize:
+        metrics.phase('optimizer')
+        in_admin_range = [x for x in my_worlds if caps and caps_index.within(x.pos, ADMIN_RANGE)]
+        assignment = optimize_assignment(in_admin_range, hubs_index, fonds_index, galaxy, routes, supply,
+                                         hub_capacity,
+                                         budget=budget.available(SET_TRADE_ROUTE))
+        print('Optimized assignment: %d worlds to hubs, %d to foundations, %d unmet needs, ~%d mutations' %
+              (len(assignment.hubs), len(assignment.fonds), assignment.unmet, assignment.mutations))
+        if assignment.unassigned:
+            print('Hub capacity exhausted, %d worlds left without a hub: %s' % (
+                len(assignment.unassigned), [galaxy[x].name for x in assignment.unassigned]))
+
+    for world in changed_worlds:
+        plan.owner = world.id
+        metrics.phase('hub assignment')
         try:
-            print('\nWorld:', world['name'])
-
-            designation = api.scenario_info[world['designation']]
-            print('Designation:', designation['nameDesc'])
-            print('Tech:', world['techLevel'])
+            print('\nWorld:', world.name)
+            print('Designation:', catalog.name(world.designation))
+            print('Tech:', world.tech_level)
 
             # determine max trade distance
             # TODO: game client uses this to check for spaceport:
             #       importerHasSpaceport = (this.tradeRouteMax != null && this.tradeRouteMax > 0)
-            traits = [(x if type(x) is int else x['traitID']) for x in world['traits']]  # flat list of ids
-            has_spaceport = any(api.scenario_info[x].get('role', None) == 'spaceport' for x in traits)
-            trade_distance = 200 if has_spaceport else 100
-            print('Trade distance:', trade_distance, '(no spaceport)' if not has_spaceport else '')
+            print('Trade distance:', world.trade_distance, '(no spaceport)' if not world.has_spaceport else '')
 
             if not is_in_admin_range(world):
-                print('%s is not in admin range.' % world['name'])
+                print('%s is not in admin range.' % world.name)
                 raise SkipWorldException()
 
             if not hubs:
@@ -184,175 +252,199 @@ def main():
 
             # if this world is not a hub, create trade route with closest hub
             # TODO: closest hub that has needed resource
-            if designation['unid'] != 'core.tradingHubDesignation':
-                # TODO: in_range should be a func that I can use for fonds too
-                print('\nTrade hubs distance:')
-                hubs.sort(key=lambda x: api.dist(x['pos'], world['pos']))
-                for hub in hubs:
-                    print('%s: %.2f' % (hub['name'], api.dist(hub['pos'], world['pos'])))
+            if not world.is_hub:
+                hub = hubs_index.nearest(world.pos)[0]  # closest hub
+                print('\nClosest hub: %s  (distance %.2f)' % (hub.name, api.dist(hub.pos, world.pos)))
 
-                hub = hubs[0]  # closest hub
-                print('\nClosest hub: %s  (distance %.2f)' % (hub['name'], api.dist(hub['pos'], world['pos'])))
+                hubs_in_range = hubs_index.within(world.pos, world.trade_distance)
+                print('\nHubs in range: %s' % ['%s (%.2f)' % (x.name, api.dist(x.pos, world.pos))
+                                              for x in hubs_in_range])
 
-                hubs_in_range = [x for x in hubs if api.dist(x['pos'], world['pos']) <= trade_distance]
-                print('\nHubs in range: %s' % [x['name'] for x in hubs_in_range])
+                if assignment is not None:
+                    hub = galaxy[assignment.hubs[world.id]] if world.id in assignment.hubs else None
+                    print('Optimizer picked hub: %s' % (hub and hub.name))
+                    if hub is None:
+                        hubs_in_range = []
 
                 if hubs_in_range:
-                    # hub = min(hubs_in_range, key=lambda x: api.dist(x['pos'], world['pos']))
+                    # hub = min(hubs_in_range, key=lambda x: api.dist(x.pos, world.pos))
 
                     print('%s belongs to hub %s (distance %.2f)' %
-                          (world['name'], hub['name'], api.dist(hub['pos'], world['pos'])))
+                          (world.name, hub.name, api.dist(hub.pos, world.pos)))
 
                     for_export = what_world_offers(world)
-                    print('\nCan export:', [api.scenario_info[x]['nameDesc'] for x in for_export])
+                    print('\nCan export:', catalog.names(for_export))
 
                     for_import = what_world_needs(world)
-                    print('\nShould import:', [api.scenario_info[x]['nameDesc'] for x in for_import])
+                    print('\nShould import:', catalog.names(for_import))
 
-                    hub_offers = hub['can_export']
-                    print('\n%s offers: %s' % (hub['name'], [api.scenario_info[x]['nameDesc'] for x in hub_offers]))
+                    hub_offers = hub_exports[hub.id]
+                    print('\n%s offers: %s' % (hub.name, catalog.names(hub_offers)))
 
                     for_import = for_import & hub_offers
-                    print('\nCan import:', [api.scenario_info[x]['nameDesc'] for x in for_import])
+                    print('\nCan import:', catalog.names(for_import))
 
                     # TODO: look for a closes hub that has everything world needs. If no hub in range has everything,
                     #       then create multiple import routes
 
-                    correct_routes.add(frozenset({world['id'], hub['id']}))
-
-                    print('\nSetting trade routes:')
+                    print('\nPlanned trade routes:')
                     # imports
-                    print('%s -> %s: all demand  ' % (hub['name'], world['name']), end='', flush=True)
-                    if not all([is_route_present(world, hub, 'imports', 100, x) for x in for_import]):
-                        # TODO: if DefaultRoute brings issues, replace it with explicit routes
-                        #       (issues will arise if I want to import resources from both hub and another planet)
-                        api.set_trade_route(world['id'], hub['id'], 'addDefaultRoute')
-                        print('[added]')
-                    else:
-                        print('[present]')
+                    # TODO: if DefaultRoute brings issues, replace it with explicit routes
+                    #       (issues will arise if I want to import resources from both hub and another planet)
+                    description = '%s -> %s: all demand' % (hub.name, world.name)
+                    plan.add_default_route(PRIORITY_IMPORT, world.id, hub.id, for_import, description)
+                    print(description)
 
                     # exports
+                    amount = 100
                     for resource in for_export:
-                        print('%s -> %s: %s  ' % (world['name'], hub['name'], api.scenario_info[resource]['nameDesc']),
-                              end='', flush=True)
-                        amount = 100
-                        if not is_route_present(world, hub, 'exports', amount, resource):
-                            api.set_trade_route(hub['id'], world['id'], 'consumption', amount, resource)
-                            print('[added]')
-                        else:
-                            print('[present]')
+                        description = '%s -> %s: %s' % (world.name, hub.name, catalog.name(resource))
+                        plan.set_trade_route(PRIORITY_EXPORT, hub.id, world.id, 'consumption', amount, resource,
+                                             description)
+                        print(description)
 
                     # now create special resource propagation routes to other hubs
                     # (hubs can operate only on resources that they import;
                     #  importing 0% is enough to let hub know it can export this resource)
+                    metrics.phase('propagation')
                     hubs_in_range = [x for x in hubs_in_range if x != hub]  # remove our parent hub
                     if hubs_in_range:
                         print('\n---Propagation routes---')
                     for resource in for_export:
                         for hub in hubs_in_range:
-                            exporters = world_exporters_by_resource(hub, resource)
                             # we count only producer planets here, not other hubs
-                            exporters = [x for x in exporters
-                                         if api.scenario_info[x['designation']]['unid'] != 'core.tradingHubDesignation']
+                            exporters = supply.exporters(hub.id, resource)
 
-                            print('\n%s %s exporters: %s' % (hub['name'], api.scenario_info[resource]['nameDesc'],
-                                  [x['name'] for x in exporters]))
-                            print('\n%s -> %s: %s  ' % (
-                                  world['name'], hub['name'], api.scenario_info[resource]['nameDesc']),
+                            print('\n%s %s exporters: %s' % (hub.name, catalog.name(resource),
+                                  [galaxy[x].name for x in exporters]))
+                            print('\n%s -> %s: %s  ' % (world.name, hub.name, catalog.name(resource)),
                                   end='', flush=True)
 
-                            print('\n%s can export: %s' %
-                                  (hub['name'], [api.scenario_info[x]['nameDesc'] for x in hub['can_export']]))
-
-                            if not exporters and resource not in hub['can_export']:  # also checks for newly added imports
-                                api.set_trade_route(hub['id'], world['id'], 'consumption', 0, resource)
-                                correct_routes.add(frozenset({world['id'], hub['id']}))
-                                hub['can_export'].add(resource)
-                                print('[added]')
-                            elif len(exporters) == 1 and exporters[0]['id'] == world['id']:
-                                correct_routes.add(frozenset({world['id'], hub['id']}))
-                                if not is_route_present(world, hub, 'exports', 0, resource):
-                                    api.set_trade_route(hub['id'], world['id'], 'consumption', 0, resource)
-                                    print('[fixed]')
-                                else:
-                                    print('[present]')
+                            print('\n%s can export: %s' % (hub.name, catalog.names(hub_exports[hub.id])))
+
+                            # supply index also knows about routes planned during this run
+                            if not exporters or exporters == {world.id}:
+                                print('[planned]')
+                                plan.set_trade_route(PRIORITY_PROPAGATION, hub.id, world.id, 'consumption', 0,
+                                                     resource, '%s -> %s: %s 0%%' % (
+                                                         world.name, hub.name, catalog.name(resource)))
                             else:
                                 print('[not needed]')
 
             # if this world is not a fond, create tech route with closest fond
-            if designation['unid'] != 'core.universityDesignation':
-                print('\nFoundations distance:')
-                fonds.sort(key=lambda x: api.dist(x['pos'], world['pos']))
-                for fond in fonds:
-                    print('%s: %.2f' % (fond['name'], api.dist(fond['pos'], world['pos'])))
-
-                fonds_in_range = [x for x in fonds if api.dist(x['pos'], world['pos']) <= trade_distance]
-                print('\nFoundations in range: %s' % [x['name'] for x in fonds_in_range])
+            metrics.phase('fond assignment')
+            if not world.is_university:
+                fonds_in_range = fonds_index.within(world.pos, world.trade_distance)
+                print('\nFoundations in range: %s' % ['%s (%.2f)' % (x.name, api.dist(x.pos, world.pos))
+                                                     for x in fonds_in_range])
 
                 if fonds_in_range:  # if we have fonds in range
-                    # fond = min(fonds_in_range, key=lambda x: api.dist(x['pos'], world['pos']))
+                    # fond = min(fonds_in_range, key=lambda x: api.dist(x.pos, world.pos))
                     fond = fonds_in_range[0]  # closest fond
+                    if assignment is not None:
+                        fond = galaxy[assignment.fonds.get(world.id, fond.id)]
                     print('%s belongs to fond %s (distance %.2f)' %
-                          (world['name'], fond['name'], api.dist(fond['pos'], world['pos'])))
-
-                    print('\nSetting tech route:')
-                    level = fond['techLevel']
-                    print('%s -> %s: %s' % (fond['name'], world['name'], level), end='', flush=True)
-                    if not is_route_present(world, fond, 'importTech', level):
-                        api.set_trade_route(world['id'], fond['id'], 'tech', level)
-                        correct_routes.add(frozenset({world['id'], fond['id']}))
-                        print('  [added]')
-                    else:
-                        print('  [present]')
+                          (world.name, fond.name, api.dist(fond.pos, world.pos)))
+
+                    print('\nPlanned tech route:')
+                    level = fond.tech_level
+                    description = '%s -> %s: %s' % (fond.name, world.name, level)
+                    plan.set_trade_route(PRIORITY_TECH, world.id, fond.id, 'tech', level, None, description)
+                    print(description)
 
         except (anacreon.HexArcException, SkipWorldException) as e:
             if isinstance(e, anacreon.HexArcException):
                 print('\nGot exception: \n%s\n%s\n' % (e.__class__, e))
             print('\nSkipping this world.')
         finally:
-            print('\nsetTradeRoute requests: %d total (limit: 120/hr)' % getattr(api.set_trade_route, 'count', 0))
+            plan.owner = None
+            cache.store(world.id, fingerprints[world.id], plan)
+            print('\nPlanned allocations: %d total' % len(plan))
             print('\n---------\n')
 
-    # mark routes between hubs as correct, they are manually managed by player
-    print('\nMarking routes between hubs as correct')
+    # routes between hubs are manually managed by player
+    metrics.phase('cleanup')
+    print('\nKeeping routes between hubs')
     for hub in hubs:
-        for route in hub.get('tradeRoutes', []):
-            partner = api.get_obj_by_id(route['partnerObjID'])
-            if api.scenario_info[partner['designation']]['unid'] == 'core.tradingHubDesignation':
-                correct_routes.add(frozenset({hub['id'], partner['id']}))
-                print('%s <-> %s' % (hub['name'], partner['name']))
-
-    # remove all trade routes that aren't marked as correct
-    print('\nClearing obsolete trade routes\n')
-    for world in my_worlds:
-        for route in world.get('tradeRoutes', []):
-            if 'return' in route.keys():
-                continue  # don't need to clean one route two times
-
-            partner = api.get_obj_by_id(route['partnerObjID'])
-            if frozenset({world['id'], partner['id']}) not in correct_routes:
-                # remember tech part of the route, if present
-                # (for a case when route has both trade and tech exports, usually between hub and fond)
-                exportTech = route.get('exportTech', None)
-                importTech = route.get('importTech', None)
-
-                print('%s <-> %s: clearing' % (world['name'], partner['name']))
-                api.stop_trade_route(world['id'], partner['id'])
-
-                if {'imports', 'exports'}.isdisjoint(route.keys()):
-                    continue  # this is a tech-only route, no need to preserve anything
-
-                # recreate tech part of the route
-                if exportTech:
-                    api.set_trade_route(partner['id'], world['id'], exportTech[0])
-                    print('%s -> %s: uplift to %d recreated' % (world['name'], partner['name'], exportTech[0]))
-                elif importTech:
-                    api.set_trade_route(world['id'], partner['id'], importTech[0])
-                    print('%s -> %s: uplift to %d recreated' % (partner['name'], world['name'], importTech[0]))
-
-    print('\nstopTradeRoute requests: %d total (limit: 120/hr\n)' % getattr(api.stop_trade_route, 'count', 0))
+        for partner_id in routes.partners(hub.id):
+            if partner_id in galaxy and galaxy[partner_id].is_hub:
+                plan.keep_route(hub.id, partner_id)
+                print('%s <-> %s' % (hub.name, galaxy[partner_id].name))
+
+    # compare planned routes with current ones, everything not planned is cleared
+    mutations = diff(plan, routes, {x.id for x in my_worlds}, name=lambda x: api.get_obj_by_id(x)['name'])
+    print_plan(mutations, resumed)
+    if dry_run:
+        return finish(mutations, [], {})
+
+    # fingerprints are saved only when plan is really applied
+    cache.save(neighbourhood)
+    for group in finished:
+        journal.end(group)  # nothing to resume there
+
+    metrics.phase('apply')
+    print('\nExecuting %d mutations' % len(mutations))
+    deferred = apply(mutations, scheduler)
+    if journal:
+        journal.close()
+
+    requests = {
+        SET_TRADE_ROUTE: getattr(api.set_trade_route, 'count', 0),
+        STOP_TRADE_ROUTE: getattr(api.stop_trade_route, 'count', 0),
+    }
+    print('\nsetTradeRoute requests: %d total (limit: 120/hr)' % requests[SET_TRADE_ROUTE])
+    print('stopTradeRoute requests: %d total (limit: 120/hr)\n' % requests[STOP_TRADE_ROUTE])
+    return finish(mutations, deferred, requests)
+
+
+def main(dry_run: bool = False, full: bool = False, replay: str = None, replay_output: str = None,
+         **options) -> RunResult:
+    if replay:
+        # offline run against a stored snapshot, doesn't touch server, budget or caches
+        print('Replaying %s' % replay)
+        api = ReplayApi.load(replay)
+        files = StateFiles(*[None] * len(StateFiles._fields))
+    else:
+        print(os.environ.get('PYTHONPATH'))
+        print(os.environ.get("LOGIN"), os.environ.get("PASSWORD"))
+        # TODO: use ANACREON_LOGIN and ANACREON_PASSWORD names to avoid possible conflicts
+        metrics = Metrics('planner')
+        api = connect(os.environ.get("LOGIN"), os.environ.get("PASSWORD"), os.environ.get("GAME_ID"), metrics)
+        files = state_files()
+        options.update(metrics=metrics, login=os.environ.get("LOGIN"))
+
+    result = run(api, files, dry_run=dry_run, full=full, **options)
+    if replay_output:
+        api.save(replay_output)
+    return result
 
 
 if __name__ == '__main__':
-    main()
-
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dry-run', action='store_true', help='Print planned mutations and their API cost only.')
+    parser.add_argument('--full', action='store_true', help='Plan every world, ignoring fingerprints of the last run.')
+    parser.add_argument('--refresh-scenario', action='store_true', help='Fetch scenario even if it is cached.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Request only objects changed since the previous run.')
+    parser.add_argument('--optimize', action='store_true',
+                        help='Choose hubs and foundations for all worlds at once, by unmet needs and mutations.')
+    parser.add_argument('--hub-capacity', type=int, help='Max number of worlds per hub for --optimize.')
+    parser.add_argument('--replay', metavar='SOURCE',
+                        help='Run offline against a stored snapshot: path to a json file or gamedata:<id>.')
+    parser.add_argument('--replay-output', metavar='PATH', help='Save objects and mutations after a replay run.')
+    parser.add_argument('--targets', metavar='FILE',
+                        help='Plan several empires in parallel: json list of {"login", "password", "game"}.')
+    parser.add_argument('--workers', type=int, help='Number of worker processes for --targets.')
+    parser.add_argument('--log-dir', default='trade_routes_logs', help='Where --targets writes output of each target.')
+    parser.add_argument('--profile', nargs='?', const='trade_routes.prof', metavar='PATH',
+                        help='Run under cProfile, print the top functions and save stats to PATH.')
+    args = parser.parse_args()
+
+    options = dict(dry_run=args.dry_run, full=args.full, refresh_scenario=args.refresh_scenario,
+                   incremental=args.incremental, optimize=args.optimize, hub_capacity=args.hub_capacity)
+    if args.targets:
+        with open(args.targets) as f:
+            run_targets(json.load(f), options, args.workers, args.log_dir)
+    else:
+        with profiled(args.profile):
+            main(replay=args.replay, replay_output=args.replay_output, **options)
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from lib.anacreonlib import anacreon
+from lib.anacreonlib.anacreon import Anacreon
+from lib.sync import ObjectStore
+
+
+HEXARC_API = 'https://anacreon.kronosaur.com/api/'
+
+
+class RoutedSession(requests.Session):
+    # sends HexArc api requests to another server, like a local stand-in
+    def __init__(self, api_url: str = None):
+        super().__init__()
+        self.api_url = api_url
+
+    def request(self, method, url, *args, **kwargs):
+        if self.api_url and url.startswith(HEXARC_API):
+            url = self.api_url + url[len(HEXARC_API):]
+        return super().request(method, url, *args, **kwargs)
+
+
+def pooled_session(pool_size: int = 4, api_url: str = None) -> requests.Session:
+    session = RoutedSession(api_url)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
+
+class SessionRouter:
+    # anacreonlib does module level requests.get/post calls, each of them opens a new connection.
+    # Router takes place of requests module there and sends calls to the session installed on the current thread,
+    # so clients that run in different threads use their own sessions.
+    def __init__(self):
+        self.local = threading.local()
+
+    def __getattr__(self, name):
+        session = getattr(self.local, 'session', None)
+        return getattr(session if session is not None and hasattr(session, name) else requests, name)
+
+
+router = SessionRouter()
+
+
+def install_session(session: requests.Session):
+    # Session has the same get/post interface and keeps connections alive between calls
+    anacreon.requests = router
+    router.local.session = session
+
+
+def get_objects_since(api: Anacreon, sequence, session=None) -> list:
+    # anacreonlib always asks for the whole galaxy, request with the update sequence is made here
+    response = (session or requests).post(HEXARC_API + 'getObjects', json={
+        'authToken': api.auth_token,
+        'gameID': api.gameID,
+        'sovereignID': api.sovID,
+        'sequence': sequence,
+    }).json()
+    if isinstance(response, list) and response and str(response[0]).startswith('AEON2011:hexeError'):
+        raise anacreon.HexArcException(' '.join(str(x) for x in response[1:]))
+    return response
+
+
+def is_auth_error(e: Exception) -> bool:
+    # server answers an expired or invalid token with invalidAuthToken error
+    message = str(e).lower()
+    return 'authtoken' in message or 'auth token' in message
+
+
+class AnacreonClient:
+    # Keeps one logged in api object between updates, logs in again only when server rejects the token.
+    def __init__(self, login: str, password: str, game_id, session: requests.Session = None,
+                 incremental: bool = False):
+        self.login = login
+        self.password = password
+        self.game_id = game_id
+        self.session = session or pooled_session()
+        self.api = None
+        self.sov_id = None
+        self.logins = 0
+        self.latency = {}  # endpoint -> seconds of the last call
+        self.store = ObjectStore() if incremental else None  # objects are synced by update sequence
+
+    def connect(self) -> Anacreon:
+        if self.api is None:
+            self.api = Anacreon(self.login, self.password)
+            self.api.gameID = self.game_id
+            if self.sov_id is not None:
+                self.api.sovID = self.sov_id
+            self.logins += 1
+        return self.api
+
+    def call(self, method, *args, **kwargs):
+        # method is a name of api method or a function that takes api as the first argument
+        name = method if isinstance(method, str) else method.__name__
+        install_session(self.session)  # calls are made on the thread of the caller
+        for attempt in range(2):
+            api = self.connect()
+            start = time.perf_counter()
+            try:
+                if isinstance(method, str):
+                    return getattr(api, method)(*args, **kwargs)
+                return method(api, *args, **kwargs)
+            except anacreon.HexArcException as e:
+                if attempt or not is_auth_error(e):
+                    raise
+                print('%s failed, auth token was rejected, logging in again' % name)
+                self.api = None
+            finally:
+                self.latency[name] = time.perf_counter() - start
+
+    def get_game_info(self) -> dict:
+        game_info = self.call('get_game_info')
+        self.sov_id = self.api.sovID = game_info['userInfo']['sovereignID']
+        return game_info
+
+    def get_objects(self) -> list:
+        if self.store is None:
+            return self.call('get_objects')
+        start = time.perf_counter()
+        objects = self.store.sync((self.game_id, self.sov_id), lambda: self.call('get_objects'),
+                                  lambda sequence: self.call(get_objects_since, sequence, self.session))
+        self.latency['get_objects'] = time.perf_counter() - start  # whole sync, full or incremental
+        return objects
+
+    def sync_info(self) -> str:
+        if self.store is None:
+            return 'full fetch'
+        if self.store.last_changed is None:
+            return 'full fetch, %d objects' % len(self.store)
+        return '%d changed of %d objects' % (self.store.last_changed, len(self.store))
@@ -0,0 +1,195 @@
+import bisect
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # seconds, upper bounds of histogram buckets
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> list:
+        # (upper bound, observations less or equal to it), like Prometheus buckets
+        result, total = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'max': round(self.max, 6),
+            'buckets': dict(self.cumulative()),
+        }
+
+
+class Metrics:
+    # Wall time of run phases and latency, request and byte counts of every api endpoint.
+    # Phases and counters add up over runs, so a long running poller reports totals since its start.
+    def __init__(self, component: str):
+        self.component = component
+        self.phases = {}  # name -> seconds in all runs, in order of first use
+        self.last_phases = {}  # name -> seconds in the last run
+        self.current = None
+        self.phase_start = None
+        self.latency = defaultdict(Histogram)  # endpoint -> seconds
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.sent_bytes = defaultdict(int)
+        self.received_bytes = defaultdict(int)
+        self.runs = 0
+        self.started = time.time()
+
+    def start_run(self):
+        self.phase(None)
+        self.runs += 1
+        self.last_phases = {}
+
+    def phase(self, name: str = None):
+        # ends the current phase and starts the next one, None only ends it
+        now = time.perf_counter()
+        if self.current is not None:
+            elapsed = now - self.phase_start
+            self.phases[self.current] = self.phases.get(self.current, 0) + elapsed
+            self.last_phases[self.current] = self.last_phases.get(self.current, 0) + elapsed
+        self.current, self.phase_start = name, now
+
+    def observe(self, endpoint: str, seconds: float, sent: int = 0, received: int = 0, error: bool = False):
+        self.latency[endpoint].observe(seconds)
+        self.requests[endpoint] += 1
+        self.sent_bytes[endpoint] += sent
+        self.received_bytes[endpoint] += received
+        if error:
+            self.errors[endpoint] += 1
+
+    def attach(self, session):
+        # every request of the session is measured, including login and calls made inside anacreonlib.
+        # Response body is read before request() returns, so latency includes the download.
+        request = session.request
+
+        def measured(method, url, *args, **kwargs):
+            endpoint = urlparse(url).path.rstrip('/').rsplit('/', 1)[-1]
+            start = time.perf_counter()
+            try:
+                response = request(method, url, *args, **kwargs)
+            except Exception:
+                self.observe(endpoint, time.perf_counter() - start, error=True)
+                raise
+            body = response.request.body
+            self.observe(endpoint, time.perf_counter() - start, len(body) if body else 0, len(response.content),
+                         not response.ok or b'hexeError' in response.content[:64])
+            return response
+
+        session.request = measured
+
+    def report(self) -> dict:
+        return {
+            'component': self.component,
+            'runs': self.runs,
+            'started': self.started,
+            'updated': time.time(),
+            'phases': {x: {'last': round(self.last_phases.get(x, 0), 6), 'total': round(seconds, 6)}
+                       for x, seconds in self.phases.items()},
+            'endpoints': {x: {
+                'requests': self.requests[x],
+                'errors': self.errors[x],
+                'sent_bytes': self.sent_bytes[x],
+                'received_bytes': self.received_bytes[x],
+                'latency': self.latency[x].to_dict(),
+            } for x in sorted(self.requests)},
+        }
+
+    def prometheus(self) -> str:
+        # text exposition format, for node_exporter textfile collector
+        lines = []
+
+        def metric(name: str, kind: str, description: str, samples: list):
+            lines.append('# HELP anacreon_%s %s' % (name, description))
+            lines.append('# TYPE anacreon_%s %s' % (name, kind))
+            for suffix, labels, value in samples:
+                labels = ','.join('%s="%s"' % x for x in (('component', self.component),) + labels)
+                lines.append('anacreon_%s%s{%s} %s' % (name, suffix, labels, value))
+
+        metric('phase_seconds_total', 'counter', 'Wall time spent in a phase.',
+               [('', (('phase', x),), '%.6f' % seconds) for x, seconds in self.phases.items()])
+        metric('phase_last_seconds', 'gauge', 'Wall time spent in a phase during the last run.',
+               [('', (('phase', x),), '%.6f' % seconds) for x, seconds in self.last_phases.items()])
+        metric('runs_total', 'counter', 'Completed runs.', [('', (), self.runs)])
+        metric('last_run_timestamp_seconds', 'gauge', 'Time of the last report.', [('', (), '%.3f' % time.time())])
+
+        latency = []
+        for endpoint in sorted(self.latency):
+            histogram = self.latency[endpoint]
+            latency += [('_bucket', (('endpoint', endpoint), ('le', bound)), count)
+                        for bound, count in histogram.cumulative()]
+            latency += [('_sum', (('endpoint', endpoint),), '%.6f' % histogram.sum),
+                        ('_count', (('endpoint', endpoint),), histogram.count)]
+        metric('api_latency_seconds', 'histogram', 'Latency of api requests, including response download.', latency)
+
+        for name, values, description in (
+                ('api_requests_total', self.requests, 'Api requests sent.'),
+                ('api_errors_total', self.errors, 'Api requests that failed or returned a HexArc error.'),
+                ('api_sent_bytes_total', self.sent_bytes, 'Bytes of api request bodies.'),
+                ('api_received_bytes_total', self.received_bytes, 'Bytes of api responses.')):
+            metric(name, 'counter', description, [('', (('endpoint', x),), values[x]) for x in sorted(self.requests)])
+        return '\n'.join(lines) + '\n'
+
+    def save(self, json_path: str = None, prometheus_path: str = None):
+        # files are replaced at once, textfile collector must never read a partial file
+        for path, content in ((json_path, lambda: json.dumps(self.report(), indent=2)),
+                              (prometheus_path, self.prometheus)):
+            if path:
+                with open(path + '.tmp', 'w') as f:
+                    f.write(content())
+                os.replace(path + '.tmp', path)
+
+    def print_summary(self):
+        print('\nPhases:')
+        for x, seconds in self.last_phases.items():
+            print('  %-20s %8.3fs' % (x, seconds))
+        if self.requests:
+            print('\n  %-20s %8s %6s %9s %9s %12s' % ('Endpoint', 'Requests', 'Errors', 'Mean', 'Max', 'Received'))
+        for x in sorted(self.requests):
+            histogram = self.latency[x]
+            print('  %-20s %8d %6d %8.3fs %8.3fs %11.1fK' % (x, self.requests[x], self.errors[x],
+                                                            histogram.sum / histogram.count, histogram.max,
+                                                            self.received_bytes[x] / 1024))
+
+
+@contextlib.contextmanager
+def profiled(path: str = None, top: int = 30):
+    # wraps a block in cProfile when path is given, stats can be opened later with python -m pstats
+    if path is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+        pstats.Stats(profile).sort_stats('cumulative').print_stats(top)
+        print('Profile saved to %s' % path)
@@ -0,0 +1,79 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for HexArc endpoints used by the collectors: login, getGameInfo and getObjects.
+# Games are loaded from a json file: {"<game id>": {"gameInfo": {...}, "objects": [...]}}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real server
+
+    def do_GET(self):
+        self.handle_api(dict(x.split('=', 1) for x in self.path.partition('?')[2].split('&') if '=' in x))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        self.handle_api(json.loads(body) if body else {})
+
+    def handle_api(self, data: dict):
+        server = self.server
+        endpoint = self.path.partition('?')[0].rstrip('/').rsplit('/', 1)[-1]
+        time.sleep(server.latency)
+        with server.lock:
+            server.requests[endpoint] = server.requests.get(endpoint, 0) + 1
+
+        if endpoint == 'login':
+            response = {'authToken': 'token-%s' % data.get('username'), 'username': data.get('username')}
+        elif endpoint not in ('getGameInfo', 'getObjects'):
+            return self.reply(404, {'error': 'unknown endpoint %s' % endpoint})
+        elif not str(data.get('authToken', '')).startswith('token-'):
+            response = ['AEON2011:hexeError:v1', 'invalidAuthToken', 'Invalid auth token.']
+        elif str(data.get('gameID')) not in server.games:
+            response = ['AEON2011:hexeError:v1', 'unknownGame', 'Unknown game.']
+        elif endpoint == 'getGameInfo':
+            response = server.games[str(data['gameID'])]['gameInfo']
+        else:
+            response = server.games[str(data['gameID'])]['objects']
+        self.reply(200, response)
+
+    def reply(self, status: int, response):
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(games: dict, host: str = '127.0.0.1', port: int = 0, latency: float = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.games = {str(id): game for id, game in games.items()}
+    server.latency = latency
+    server.requests = {}
+    server.lock = threading.Lock()
+    return server
+
+
+def api_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return 'http://%s:%d/api/' % (host, port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('games', help='Json file with game info and objects of every game.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='Delay of every response, in seconds.')
+    args = parser.parse_args()
+
+    with open(args.games) as f:
+        server = make_server(json.load(f), port=args.port, latency=args.latency)
+    print('Serving HexArc stand-in at %s' % api_url(server))
+    server.serve_forever()
@@ -0,0 +1,90 @@
+import os
+import pickle
+
+UPDATE_CLASS = 'update'  # service object with the update sequence of the response
+DESTROYED_CLASS = 'destroyedSpaceObject'
+FULL_SYNC_INTERVAL = 60  # full fetch every n syncs, in case something was missed between sequences
+
+
+class ObjectStore:
+    # Local copy of the visible galaxy. After the first full getObjects only objects changed
+    # since the last update sequence are requested and merged in.
+    def __init__(self, full_sync_interval: int = FULL_SYNC_INTERVAL):
+        self.full_sync_interval = full_sync_interval
+        self.objects = {}  # id -> object
+        self.other = []  # objects without id, like the update sequence
+        self.sequence = None
+        self.key = None  # (game id, sovereign id) objects belong to
+        self.syncs_since_full = 0
+        self.last_changed = None  # objects received by the last sync, None after a full fetch
+
+    def __len__(self):
+        return len(self.objects)
+
+    @staticmethod
+    def find_sequence(objects: list):
+        return next((x.get('sequence') for x in objects if isinstance(x, dict) and x.get('class') == UPDATE_CLASS),
+                    None)
+
+    def values(self) -> list:
+        return list(self.objects.values()) + self.other
+
+    def replace(self, objects: list, key=None):
+        self.objects = {x['id']: x for x in objects if isinstance(x, dict) and 'id' in x}
+        self.other = [x for x in objects if not isinstance(x, dict) or 'id' not in x]
+        self.sequence = self.find_sequence(objects)
+        self.key = key
+        self.syncs_since_full = 0
+        self.last_changed = None
+
+    def merge(self, objects: list) -> bool:
+        # false when the response doesn't continue our sequence, then only a full fetch can be trusted
+        sequence = self.find_sequence(objects)
+        if sequence is None or self.sequence is None or sequence < self.sequence:
+            return False
+
+        changed = 0
+        for obj in objects:
+            if not isinstance(obj, dict) or 'id' not in obj:
+                continue
+            if obj.get('class') == DESTROYED_CLASS:
+                self.objects.pop(obj['id'], None)
+            else:
+                self.objects[obj['id']] = obj
+            changed += 1
+
+        self.other = [x for x in objects if not isinstance(x, dict) or 'id' not in x]
+        self.sequence = sequence
+        self.syncs_since_full += 1
+        self.last_changed = changed
+        return True
+
+    def needs_full(self, key) -> bool:
+        return (self.sequence is None or key != self.key or
+                bool(self.full_sync_interval) and self.syncs_since_full + 1 >= self.full_sync_interval)
+
+    def sync(self, key, get_objects, get_objects_since) -> list:
+        # get_objects() returns the whole galaxy, get_objects_since(sequence) only what changed
+        if not self.needs_full(key):
+            if self.merge(get_objects_since(self.sequence)):
+                return self.values()
+            print('Update sequence is out of step, fetching all objects')
+        self.replace(get_objects(), key)
+        return self.values()
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'ObjectStore':
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+                print('Object store is unreadable, ignoring it: %s' % e)
+        return cls(**kwargs)
+
+    def save(self, path: str):
+        if not path:
+            return
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,165 @@
+from collections import deque, namedtuple
+
+from planner.model import Galaxy, World
+from planner.routes import RouteIndex
+from planner.spatial import dist
+from planner.supply import SupplyIndex
+
+NEED_WEIGHT = 3.0  # need of a world that its hub can't cover
+MUTATION_WEIGHT = 1.0  # one setTradeRoute or stopTradeRoute
+DISTANCE_WEIGHT = 0.001  # prefer closer partner when everything else is equal
+UNASSIGNED_COST = 10.0 ** 6  # world left without a partner, only when capacities don't allow anything else
+
+# world id -> hub / fond, unmet needs and mutations of the chosen partners,
+# ids of worlds that have hubs in range but didn't get any, because of hub capacity
+Assignment = namedtuple('Assignment', 'hubs fonds unmet mutations unassigned')
+
+# one partner a world can be assigned to
+Option = namedtuple('Option', 'partner unmet mutations distance')
+
+
+class MinCostFlow:
+    # Successive shortest paths with Bellman-Ford, graphs here are small:
+    # worlds x partners in trade range
+    def __init__(self, size: int):
+        self.graph = [[] for _ in range(size)]  # node -> [[to, capacity, cost, reverse edge index]]
+
+    def add_edge(self, source: int, target: int, capacity: int, cost: float) -> list:
+        edge = [target, capacity, cost, len(self.graph[target])]
+        self.graph[source].append(edge)
+        self.graph[target].append([source, 0, -cost, len(self.graph[source]) - 1])
+        return edge
+
+    def solve(self, source: int, sink: int) -> float:
+        total = 0
+        while True:
+            distance = [None] * len(self.graph)
+            previous = [None] * len(self.graph)
+            distance[source] = 0
+            queue, queued = deque([source]), {source}
+            while queue:
+                node = queue.popleft()
+                queued.discard(node)
+                for i, (target, capacity, cost, _) in enumerate(self.graph[node]):
+                    if capacity > 0 and (distance[target] is None or distance[node] + cost < distance[target] - 1e-9):
+                        distance[target] = distance[node] + cost
+                        previous[target] = (node, i)
+                        if target not in queued:
+                            queue.append(target)
+                            queued.add(target)
+            if distance[sink] is None:
+                return total
+
+            flow, node = None, sink
+            while node != source:
+                parent, i = previous[node]
+                flow = self.graph[parent][i][1] if flow is None else min(flow, self.graph[parent][i][1])
+                node = parent
+            node = sink
+            while node != source:
+                parent, i = previous[node]
+                edge = self.graph[parent][i]
+                edge[1] -= flow
+                self.graph[node][edge[3]][1] += flow
+                node = parent
+            total += flow * distance[sink]
+
+
+def choose(options: dict, weights: tuple, capacity: int = None) -> dict:
+    # world id -> partner id with the lowest total cost, partners take at most capacity worlds
+    def cost(x):
+        return weights[0] * x.unmet + weights[1] * x.mutations + DISTANCE_WEIGHT * x.distance
+
+    if capacity is None:  # every world can choose independently, that is the optimum
+        return {world_id: min(x, key=cost).partner for world_id, x in options.items() if x}
+
+    world_ids = list(options)
+    partner_ids = sorted({x.partner for world_options in options.values() for x in world_options})
+    nodes = {('world', x): i + 2 for i, x in enumerate(world_ids)}
+    nodes.update({('partner', x): i + 2 + len(world_ids) for i, x in enumerate(partner_ids)})
+    source, sink = 0, 1
+    graph = MinCostFlow(len(nodes) + 2)
+
+    edges = {}
+    for world_id in world_ids:
+        node = nodes['world', world_id]
+        graph.add_edge(source, node, 1, 0)
+        graph.add_edge(node, sink, 1, UNASSIGNED_COST)
+        for x in options[world_id]:
+            edges[world_id, x.partner] = graph.add_edge(node, nodes['partner', x.partner], 1, cost(x))
+    for partner_id in partner_ids:
+        graph.add_edge(nodes['partner', partner_id], sink, capacity, 0)
+
+    graph.solve(source, sink)
+    return {world_id: partner_id for (world_id, partner_id), edge in edges.items() if edge[1] == 0}
+
+
+def projected_supply(producers: list, hubs_index, supply: SupplyIndex) -> dict:
+    # what every hub will be able to export after planning: current supply plus offers of producers in range,
+    # each of them exports to its hub and propagates to other hubs in range
+    result = {hub_id: set(supply.can_export(hub_id)) for hub_id in supply.hub_ids}
+    for world in producers:
+        for hub in hubs_index.within(world.pos, world.trade_distance):
+            result.setdefault(hub.id, set()).update(world.offers)
+    return result
+
+
+def hub_options(world: World, hubs: list, can_export: dict, routes: RouteIndex, hub_ids: set) -> list:
+    current = {x for x in routes.partners(world.id) if x in hub_ids}
+    options = []
+    for hub in hubs:
+        imports = world.needs & can_export.get(hub.id, set())
+        mutations = 0
+        if not all(routes.is_route_present(world.id, hub.id, 'imports', 100, x) for x in imports):
+            mutations += 1  # default route
+        mutations += sum(not routes.is_route_present(hub.id, world.id, 'imports', 100, x) for x in world.offers)
+        mutations += len(current - {hub.id})  # routes to other hubs are cleared
+        options.append(Option(hub.id, len(world.needs - imports), mutations, dist(world.pos, hub.pos)))
+    return options
+
+
+def fond_options(world: World, fonds: list, routes: RouteIndex, fond_ids: set) -> list:
+    current = {x for x in routes.partners(world.id) if x in fond_ids}
+    options = []
+    for fond in fonds:
+        mutations = int(not routes.is_route_present(world.id, fond.id, 'importTech', fond.tech_level))
+        mutations += len(current - {fond.id})
+        options.append(Option(fond.id, 0, mutations, dist(world.pos, fond.pos)))
+    return options
+
+
+def optimize(worlds: list, hubs_index, fonds_index, galaxy: Galaxy, routes: RouteIndex, supply: SupplyIndex,
+             hub_capacity: int = None, budget: int = None) -> Assignment:
+    # Assigns worlds to hubs and foundations for the whole territory at once. Cost of a choice is needs
+    # that the hub won't be able to cover plus mutations needed to change current routes into it.
+    # When mutations don't fit into the budget, keeping current routes gets more weight.
+    hub_ids = {x.id for x in hubs_index.objects}
+    fond_ids = {x.id for x in fonds_index.objects}
+    producers = [x for x in worlds if not x.is_hub]
+    can_export = projected_supply(producers, hubs_index, supply)
+
+    hub_choices, fond_choices = {}, {}
+    for world in producers:
+        hub_choices[world.id] = hub_options(world, hubs_index.within(world.pos, world.trade_distance),
+                                            can_export, routes, hub_ids)
+    for world in worlds:
+        if not world.is_university:
+            fond_choices[world.id] = fond_options(world, fonds_index.within(world.pos, world.trade_distance),
+                                                  routes, fond_ids)
+
+    weights = (NEED_WEIGHT, MUTATION_WEIGHT)
+    while True:
+        hubs = choose(hub_choices, weights, hub_capacity)
+        fonds = choose(fond_choices, weights)
+
+        def picked(choices, chosen):
+            return [x for world_id, partner_id in chosen.items() for x in choices[world_id] if x.partner == partner_id]
+
+        picked_options = picked(hub_choices, hubs) + picked(fond_choices, fonds)
+        mutations = sum(x.mutations for x in picked_options)
+        if budget is None or mutations <= budget or weights[1] >= NEED_WEIGHT:  # up to outweighing a need
+            # world without a hub imports nothing, all of its needs are unmet
+            unassigned = sorted(x for x, world_options in hub_choices.items() if world_options and x not in hubs)
+            unmet = sum(x.unmet for x in picked_options) + sum(len(galaxy[x].needs) for x in unassigned)
+            return Assignment(hubs, fonds, unmet, mutations, unassigned)
+        weights = (weights[0], weights[1] * 4)
@@ -0,0 +1,135 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from planner import synthetic
+from planner.scheduler import (PRIORITY_CLEANUP, PRIORITY_EXPORT, PRIORITY_IMPORT, PRIORITY_PROPAGATION, PRIORITY_TECH,
+                               SET_TRADE_ROUTE, STOP_TRADE_ROUTE)
+
+PHASES = {
+    PRIORITY_IMPORT: 'hub assignment',
+    PRIORITY_EXPORT: 'hub assignment',
+    PRIORITY_PROPAGATION: 'propagation',
+    PRIORITY_TECH: 'tech routes',
+    PRIORITY_CLEANUP: 'cleanup',
+}
+
+
+def calls_by_phase(mutations: list) -> dict:
+    result = {x: {SET_TRADE_ROUTE: 0, STOP_TRADE_ROUTE: 0} for x in PHASES.values()}
+    for x in mutations:
+        for call in x.calls:
+            result[PHASES[x.priority]][call[0]] += 1
+    return result
+
+
+def run_planner(path: str, dry_run: bool) -> list:
+    import create_trade_routes
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return create_trade_routes.main(dry_run=dry_run, full=True, replay=path)
+
+
+def run_case(worlds: int, seed: int = 0, memory: bool = True, dry_run: bool = False) -> dict:
+    start = time.perf_counter()
+    game_info, game_objects = synthetic.generate(worlds, seed=seed)
+    generated = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'galaxy.json')
+        synthetic.save(path, game_info, game_objects)
+        del game_info, game_objects
+
+        start = time.perf_counter()
+        result = run_planner(path, dry_run)
+        wall_time = time.perf_counter() - start
+
+        # separate run, tracing slows everything down and would spoil the timing
+        peak_memory = None
+        if memory:
+            tracemalloc.start()
+            run_planner(path, dry_run)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return {
+        'worlds': worlds,
+        'seed': seed,
+        'generate_time': round(generated, 3),
+        'wall_time': round(wall_time, 3),
+        'peak_memory': peak_memory,
+        'mutations': len(result.mutations),
+        'phases': {x: times['last'] for x, times in result.metrics['phases'].items()},  # seconds, in run order
+        'calls': calls_by_phase(result.mutations),
+    }
+
+
+def revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, previous: dict):
+    before = {(x['worlds'], x['seed']): x for x in previous['cases']}
+    print('\nCompared to %s:' % previous.get('revision'))
+    for case in results['cases']:
+        old = before.get((case['worlds'], case['seed']))
+        if old is None:
+            continue
+        print('  %6d worlds: wall time %.2fx, peak memory %s, mutations %+d' % (
+            case['worlds'], case['wall_time'] / max(old['wall_time'], 1e-9),
+            '%.2fx' % (case['peak_memory'] / old['peak_memory']) if case['peak_memory'] and old['peak_memory'] else '-',
+            case['mutations'] - old['mutations']))
+
+
+def main(sizes: list, seed: int = 0, memory: bool = True, dry_run: bool = False, output: str = None,
+         baseline: str = None) -> dict:
+    results = {
+        'revision': revision(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': [],
+    }
+    for worlds in sizes:
+        print('Planning %d worlds...' % worlds, end=' ', flush=True)
+        case = run_case(worlds, seed, memory, dry_run)
+        results['cases'].append(case)
+        print('%.2fs, peak memory %s, %d mutations' % (
+            case['wall_time'], '%.1f MB' % (case['peak_memory'] / 2**20) if memory else '-', case['mutations']))
+        for phase, seconds in case['phases'].items():
+            print('  %-15s %7.3fs' % (phase, seconds))
+        for phase, calls in case['calls'].items():
+            print('  %-15s %5d setTradeRoute, %5d stopTradeRoute' % (
+                phase, calls[SET_TRADE_ROUTE], calls[STOP_TRADE_ROUTE]))
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('\nResults saved to %s' % output)
+
+    if baseline:
+        with open(baseline) as f:
+            compare(results, json.load(f))
+    return results
+
+
+if __name__ == '__main__':
+    # python -m planner.benchmark 1000 10000 -o benchmark.json --baseline previous.json
+    parser = argparse.ArgumentParser(description='Run the trade route planner against synthetic galaxies.')
+    parser.add_argument('sizes', nargs='*', type=int, default=[1000, 10000], help='World counts, e.g. 1000 100000.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced run that measures peak memory.")
+    parser.add_argument('--dry-run', action='store_true', help='Measure planning only, without applying mutations.')
+    parser.add_argument('-o', '--output', help='Save results as json.')
+    parser.add_argument('--baseline', help='Results of a previous version to compare with.')
+    args = parser.parse_args()
+    main(args.sizes, args.seed, not args.no_memory, args.dry_run, args.output, args.baseline)
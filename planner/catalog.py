@@ -0,0 +1,89 @@
+import itertools
+from collections import defaultdict
+
+HUB_DESIGNATION = 'core.tradingHubDesignation'
+UNIVERSITY_DESIGNATION = 'core.universityDesignation'
+CAPITAL_ROLES = ('sectorCapital', 'imperialCapital')
+LIFE_SUPPORT_GOODS = ('core.airFilters', 'core.radiationMeds', 'core.radiationShielding', 'core.lifeSupportSupplies')
+
+
+class ScenarioCatalog:
+    # scenario_info indexed once, so classification of objects is a set membership test
+    def __init__(self, scenario_info: dict):
+        self.info = scenario_info
+        self.by_unid = {}
+        self.by_role = defaultdict(set)
+        self.by_category = defaultdict(set)
+        for id, item in scenario_info.items():
+            if 'unid' in item:
+                self.by_unid[item['unid']] = id
+            if 'role' in item:
+                self.by_role[item['role']].add(id)
+            if 'category' in item:
+                self.by_category[item['category']].add(id)
+
+        self.hub_designations = self.ids(HUB_DESIGNATION)
+        self.university_designations = self.ids(UNIVERSITY_DESIGNATION)
+        self.capital_designations = frozenset().union(*(self.by_role[x] for x in CAPITAL_ROLES))
+        self.spaceport_traits = frozenset(self.by_role['spaceport'])
+        self.commodities = frozenset(self.by_category['commodity'])
+        self.life_support_goods = self.ids(*LIFE_SUPPORT_GOODS)
+
+    def __getitem__(self, id):
+        return self.info[id]
+
+    def id(self, unid: str):
+        return self.by_unid[unid]
+
+    def ids(self, *unids) -> frozenset:
+        return frozenset(self.by_unid[x] for x in unids if x in self.by_unid)
+
+    def name(self, id) -> str:
+        return self.info[id]['nameDesc']
+
+    def names(self, ids) -> list:
+        return [self.info[x]['nameDesc'] for x in ids]
+
+    def is_hub(self, obj: dict) -> bool:
+        return obj.get('designation') in self.hub_designations
+
+    def is_university(self, obj: dict) -> bool:
+        return obj.get('designation') in self.university_designations
+
+    def is_capital(self, obj: dict) -> bool:
+        return obj.get('designation') in self.capital_designations
+
+    def has_spaceport(self, obj: dict) -> bool:
+        traits = (x if type(x) is int else x['traitID'] for x in obj.get('traits', []))
+        return any(x in self.spaceport_traits for x in traits)
+
+    def unknown(self, objects) -> set:
+        # designations and traits that are missing from the scenario, means that cached scenario is outdated
+        ids = set()
+        for obj in objects:
+            if not isinstance(obj, dict):
+                continue
+            if obj.get('designation') is not None:
+                ids.add(obj['designation'])
+            ids.update(x if type(x) is int else x['traitID'] for x in obj.get('traits', []))
+        return ids - self.info.keys()
+
+    def base_needs(self, world: dict) -> set:
+        return set(world.get('baseConsumption', [])[::3])
+
+    def production_needs(self, world: dict) -> set:
+        resources = list(itertools.chain(*[x['productionData'] for x in world.get('traits', [])
+                                           if type(x) is dict and 'productionData' in x.keys()]))
+        return {res for i, res in enumerate(resources[::3])
+                if resources[i*3+1] < 0}  # quantity produced flag, negative means consumed
+
+    def needs(self, world: dict) -> set:
+        # combined needs, ignoring life support goods
+        return self.base_needs(world) | self.production_needs(world) - self.life_support_goods
+
+    def offers(self, world: dict) -> set:
+        primary_trait = next((x for x in world.get('traits', []) if type(x) is dict and x.get('isPrimary', None)), {})
+        build_data = primary_trait.get('buildData', [])
+        return {res for i, res in enumerate(build_data[::3])
+                if not build_data[i*3+2]  # cannotBuild flag
+                and res in self.commodities}  # filter out units
@@ -0,0 +1,48 @@
+from collections import deque
+
+from planner.scheduler import RATE_LIMIT, RATE_PERIOD
+
+
+class FakeClock:
+    def __init__(self, now: float = 0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    sleep = advance
+
+
+class FakeRateLimitError(Exception):
+    pass
+
+
+class FakeApi:
+    # Offline stand-in for the mutating part of the Anacreon client.
+    # Records calls and enforces the hourly limit the same way the server does.
+    def __init__(self, clock: FakeClock, limit: int = RATE_LIMIT, period: float = RATE_PERIOD):
+        self.clock = clock
+        self.limit = limit
+        self.period = period
+        self.calls = []
+        self.history = {'set_trade_route': deque(), 'stop_trade_route': deque()}
+
+    def _check_limit(self, method: str):
+        history = self.history[method]
+        while history and history[0] <= self.clock() - self.period:
+            history.popleft()
+        if len(history) >= self.limit:
+            raise FakeRateLimitError('%s: rate limit of %d/hr exceeded' % (method, self.limit))
+        history.append(self.clock())
+
+    def set_trade_route(self, importer: int, exporter: int, alloc_type, alloc_value: float = None,
+                        res_type: int = None):
+        self._check_limit('set_trade_route')
+        self.calls.append(('set_trade_route', importer, exporter, alloc_type, alloc_value, res_type))
+
+    def stop_trade_route(self, world_id: int, partner_id: int):
+        self._check_limit('stop_trade_route')
+        self.calls.append(('stop_trade_route', world_id, partner_id))
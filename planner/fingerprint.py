@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+from planner.plan import Desired, RoutePlan
+from planner.routes import RouteIndex
+from planner.supply import SupplyIndex
+
+
+def _digest(data) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=list).encode()).hexdigest()
+
+
+def hub_supply(hubs: list, supply: SupplyIndex, offers) -> list:
+    # what the plan of a world reads from hubs in its range: what they can export
+    # and which producers export the world's offers to them
+    return sorted([x.id, sorted(supply.can_export(x.id)),
+                   sorted([r, sorted(supply.exporters(x.id, r))] for r in offers)] for x in hubs)
+
+
+def world_fingerprint(world: dict, routes: RouteIndex, supply: list = None) -> str:
+    # everything the planner reads from a world, routes are taken from both sides,
+    # supply of hubs in range is given by hub_supply()
+    world_routes = sorted([x, routes.imports(world['id'], x), routes.exports(world['id'], x),
+                           routes.import_tech(world['id'], x)] for x in routes.partners(world['id']))
+    return _digest([
+        world.get('sovereignID'),
+        world.get('designation'),
+        world.get('traits', []),  # includes productionData and buildData
+        world.get('baseConsumption', []),
+        world.get('techLevel'),
+        world.get('pos'),
+        world_routes,
+        supply or [],
+    ])
+
+
+def neighbourhood_fingerprint(hubs: list, fonds: list, caps: list) -> str:
+    # any change of hub, fond or capital sets can change the plan of every world around them
+    def key(worlds):
+        return sorted([x.id, x.pos, x.tech_level] for x in worlds)
+    return _digest([key(hubs), key(fonds), key(caps)])
+
+
+class PlanCache:
+    # Fingerprints and planned allocations of every world from the previous run.
+    # Worlds with the same fingerprint reuse their old allocations instead of being planned again.
+    def __init__(self, path: str = None):
+        self.path = path
+        self.neighbourhood = None
+        self.worlds = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.neighbourhood = state.get('neighbourhood')
+            self.worlds = {int(id): x for id, x in state.get('worlds', {}).items()}
+        self.stored = {}
+
+    def is_fresh(self, world_id: int, fingerprint: str, neighbourhood: str) -> bool:
+        return neighbourhood == self.neighbourhood and self.worlds.get(world_id, {}).get('fingerprint') == fingerprint
+
+    def replay(self, world_id: int, plan: RoutePlan) -> int:
+        desired = [Desired(*x) for x in self.worlds[world_id]['desired']]
+        plan.owner = world_id
+        for x in desired:
+            alloc_value = frozenset(x.alloc_value) if x.alloc_type == 'addDefaultRoute' else x.alloc_value
+            plan.set_trade_route(x.priority, x.importer, x.exporter, x.alloc_type, alloc_value, x.res_type,
+                                 x.description)
+        plan.owner = None
+        return len(desired)
+
+    def store(self, world_id: int, fingerprint: str, plan: RoutePlan):
+        self.stored[world_id] = {'fingerprint': fingerprint, 'desired': plan.by_world.get(world_id, [])}
+
+    def save(self, neighbourhood: str):
+        if not self.path:
+            return
+        state = {'neighbourhood': neighbourhood, 'worlds': self.stored}
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f, default=list)
+        os.replace(self.path + '.tmp', self.path)
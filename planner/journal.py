@@ -0,0 +1,103 @@
+import json
+import os
+from collections import namedtuple
+
+from planner.routes import RouteIndex
+from planner.scheduler import STOP_TRADE_ROUTE
+
+# rest of an interrupted group: its calls from offset on still have to be executed
+Resume = namedtuple('Resume', 'group priority calls offset description')
+
+
+class MutationJournal:
+    # Write-ahead log of mutation groups, one json line per event, each of them is on disk before we go on:
+    #   {"begin": id, "priority": p, "calls": [...], "description": "..."}  before the first call of a group
+    #   {"done": id, "call": i}                                             after a call succeeded
+    #   {"end": id}                                                         group is finished, or given up
+    # Groups without the end event were interrupted, see reconcile().
+    def __init__(self, path: str):
+        self.path = path
+        self.groups = {}  # id -> begin event with 'done' set of call indexes, only groups that are not ended
+        self.next_id = 1
+        self.file = None
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self._replay(json.loads(line))
+                    except ValueError:
+                        break  # last line was cut off by the crash
+
+    def _replay(self, event: dict):
+        if 'begin' in event:
+            self.groups[event['begin']] = dict(event, done=set())
+            self.next_id = max(self.next_id, event['begin'] + 1)
+        elif 'done' in event and event['done'] in self.groups:
+            self.groups[event['done']]['done'].add(event['call'])
+        elif 'end' in event:
+            self.groups.pop(event['end'], None)
+
+    def pending(self) -> list:
+        return [self.groups[x] for x in sorted(self.groups)]
+
+    def _write(self, event: dict):
+        if self.file is None:
+            # journal is rewritten with pending groups only, finished ones are of no use
+            with open(self.path + '.tmp', 'w') as f:
+                for group in self.pending():
+                    f.write(json.dumps({k: v for k, v in group.items() if k != 'done'}) + '\n')
+                    f.writelines(json.dumps({'done': group['begin'], 'call': x}) + '\n' for x in sorted(group['done']))
+            os.replace(self.path + '.tmp', self.path)
+            self.file = open(self.path, 'a')
+        self._replay(event)
+        self.file.write(json.dumps(event) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def begin(self, priority: int, calls: list, description: str = '') -> int:
+        group = self.next_id
+        self._write({'begin': group, 'priority': priority, 'calls': calls, 'description': description})
+        return group
+
+    def done(self, group: int, call: int):
+        self._write({'done': group, 'call': call})
+
+    def end(self, group: int):
+        self._write({'end': group})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if not self.groups and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def is_applied(call: list, routes: RouteIndex) -> bool:
+    # whether fetched routes already show the effect of a call, it could succeed right before the crash
+    method, *args = call
+    if method == STOP_TRADE_ROUTE:
+        return args[1] not in routes.partners(args[0])
+    importer, exporter, alloc_type, alloc_value, res_type = args
+    if alloc_type == 'tech':
+        return routes.is_route_present(importer, exporter, 'importTech', alloc_value)
+    if alloc_type == 'consumption':
+        return routes.is_route_present(importer, exporter, 'imports', alloc_value, res_type)
+    return False  # default route, server decides what it imports
+
+
+def reconcile(journal: MutationJournal, routes: RouteIndex) -> tuple:
+    # Interrupted groups against fetched routes, returns groups to resume and ids of groups to close.
+    # A group that didn't get anything done is closed, planning decides again if it is still needed.
+    # A group that is done halfway, like a stopped route whose tech part wasn't recreated, has to be
+    # finished: fetched state doesn't show what it was.
+    resume, finished = [], []
+    for group in journal.pending():
+        calls = group['calls']
+        complete = [i in group['done'] or is_applied(x, routes) for i, x in enumerate(calls)]
+        if all(complete) or not complete[0]:
+            finished.append(group['begin'])
+            continue
+        offset = complete.index(False)
+        resume.append(Resume(group['begin'], group['priority'], calls[offset:], offset, group['description']))
+    return resume, finished
@@ -0,0 +1,69 @@
+from planner.catalog import ScenarioCatalog
+from planner.routes import RouteRecord
+from planner.spatial import SPACEPORT_TRADE_RANGE, TRADE_RANGE
+
+TradeRoute = RouteRecord  # routes are decoded once by RouteIndex, see planner.routes
+
+
+class World:
+    # Everything the planner reads from a world object, decoded once per fetch, the raw dict isn't kept.
+    # Sets are frozen and shared between worlds with the same contents. Needs and offers are decoded
+    # only for planned worlds, foreign ones may lack the data and get empty sets.
+    __slots__ = ('id', 'name', 'pos', 'sovereign_id', 'designation', 'tech_level', 'traits', 'has_spaceport',
+                 'trade_distance', 'is_hub', 'is_university', 'is_capital', 'is_built', 'base_needs',
+                 'production_needs', 'needs', 'offers')
+
+    def __init__(self, obj: dict, catalog: ScenarioCatalog, galaxy: 'Galaxy', planned: bool = True):
+        self.id = obj['id']
+        self.name = obj.get('name')
+        self.pos = tuple(obj.get('pos', ()))
+        self.sovereign_id = obj.get('sovereignID')
+        self.designation = obj.get('designation')
+        self.tech_level = obj.get('techLevel')
+        self.traits = galaxy.intern(x if type(x) is int else x['traitID'] for x in obj.get('traits', []))
+        self.has_spaceport = not self.traits.isdisjoint(catalog.spaceport_traits)
+        self.trade_distance = SPACEPORT_TRADE_RANGE if self.has_spaceport else TRADE_RANGE
+        self.is_hub = self.designation in catalog.hub_designations
+        self.is_university = self.designation in catalog.university_designations
+        self.is_capital = self.designation in catalog.capital_designations
+        self.is_built = 'buildComplete' not in obj  # not having a buildComplete date means thing is already built
+        empty = galaxy.intern(())
+        self.base_needs = galaxy.intern(catalog.base_needs(obj)) if planned else empty
+        self.production_needs = galaxy.intern(catalog.production_needs(obj)) if planned else empty
+        self.needs = galaxy.intern(catalog.needs(obj)) if planned else empty
+        self.offers = galaxy.intern(catalog.offers(obj)) if planned else empty
+
+    def __repr__(self):
+        return '<World %s %s>' % (self.id, self.name)
+
+
+class Galaxy:
+    # worlds of one fetch by id, needs and offers are decoded for worlds of sovereign_id, or all of them
+    def __init__(self, objects, catalog: ScenarioCatalog, sovereign_id: int = None):
+        self.catalog = catalog
+        self.worlds = {}
+        self.interned = {}
+        for obj in objects:
+            if not isinstance(obj, dict) or obj.get('class') != 'world':
+                continue
+            planned = sovereign_id is None or obj.get('sovereignID') == sovereign_id
+            self.worlds[obj['id']] = World(obj, catalog, self, planned)
+
+    def intern(self, items) -> frozenset:
+        items = frozenset(items)
+        return self.interned.setdefault(items, items)
+
+    def __getitem__(self, world_id: int) -> World:
+        return self.worlds[world_id]
+
+    def __contains__(self, world_id: int) -> bool:
+        return world_id in self.worlds
+
+    def __iter__(self):
+        return iter(self.worlds.values())
+
+    def __len__(self):
+        return len(self.worlds)
+
+    def owned_by(self, sovereign_id: int) -> list:
+        return [x for x in self.worlds.values() if x.sovereign_id == sovereign_id]
@@ -0,0 +1,128 @@
+import math
+from collections import defaultdict, namedtuple
+
+from planner.routes import RouteIndex
+from planner.scheduler import PRIORITY_CLEANUP, RATE_LIMIT, SET_TRADE_ROUTE, STOP_TRADE_ROUTE, MutationScheduler
+
+# one allocation that planner wants to see on a route
+Desired = namedtuple('Desired', 'priority importer exporter alloc_type alloc_value res_type description')
+
+# calls that are executed together, see MutationScheduler.submit()
+Mutation = namedtuple('Mutation', 'priority calls description')
+
+
+class RoutePlan:
+    # Desired state of routes, built by the planner without touching the api.
+    # Listeners (supply index) are notified about every new allocation, so planning can rely on it.
+    def __init__(self):
+        self.desired = {}  # (importer, exporter, alloc type, resource) -> Desired
+        self.kept = set()  # pairs of worlds whose routes are managed by player
+        self.set_listeners = []
+        self.owner = None  # world that is being planned now
+        self.by_world = defaultdict(list)  # world id -> allocations planned for it
+
+    def __len__(self):
+        return len(self.desired)
+
+    def set_trade_route(self, priority: int, importer: int, exporter: int, alloc_type: str, alloc_value=None,
+                        res_type: int = None, description: str = ''):
+        desired = Desired(priority, importer, exporter, alloc_type, alloc_value, res_type, description)
+        if self.owner is not None:
+            self.by_world[self.owner].append(desired)
+
+        key = (importer, exporter, alloc_type, res_type)
+        if key in self.desired:
+            return
+        self.desired[key] = desired
+        for listener in self.set_listeners:
+            listener(importer, exporter, alloc_type, alloc_value, res_type)
+
+    def add_default_route(self, priority: int, importer: int, exporter: int, resources: set, description: str = ''):
+        # default route imports all demand, resources are what we expect to be imported by it
+        self.set_trade_route(priority, importer, exporter, 'addDefaultRoute', frozenset(resources),
+                             description=description)
+
+    def keep_route(self, world_id: int, partner_id: int):
+        self.kept.add(frozenset({world_id, partner_id}))
+
+    def pairs(self) -> set:
+        return {frozenset({x.importer, x.exporter}) for x in self.desired.values()} | self.kept
+
+
+def is_satisfied(desired: Desired, routes: RouteIndex) -> bool:
+    if desired.alloc_type == 'addDefaultRoute':
+        return all(routes.is_route_present(desired.importer, desired.exporter, 'imports', 100, x)
+                   for x in desired.alloc_value)
+    if desired.alloc_type == 'tech':
+        return routes.is_route_present(desired.importer, desired.exporter, 'importTech', desired.alloc_value)
+    return routes.is_route_present(desired.importer, desired.exporter, 'imports', desired.alloc_value,
+                                   desired.res_type)
+
+
+def diff(plan: RoutePlan, routes: RouteIndex, owners: set, name=str) -> list:
+    # smallest list of mutations that turns current routes into the planned ones
+    mutations = []
+    for x in plan.desired.values():
+        if not is_satisfied(x, routes):
+            call = (SET_TRADE_ROUTE, x.importer, x.exporter, x.alloc_type,
+                    None if x.alloc_type == 'addDefaultRoute' else x.alloc_value, x.res_type)
+            mutations.append(Mutation(x.priority, [call], x.description))
+
+    # worlds that get their tech from a planned route don't need old tech routes recreated
+    tech_importers = {x.importer for x in plan.desired.values() if x.alloc_type == 'tech'}
+
+    pairs = plan.pairs()
+    for route in routes.records():  # every route is listed once, from the side that owns its data
+        if route.owner not in owners or frozenset({route.owner, route.partner}) in pairs:
+            continue
+
+        description = '%s <-> %s: clearing' % (name(route.owner), name(route.partner))
+        calls = [(STOP_TRADE_ROUTE, route.owner, route.partner)]
+
+        # stopping removes the tech part of the route too (usually between hub and fond),
+        # recreate it unless this is a tech-only route. It can't be an edit of the route: setTradeRoute only sets
+        # an allocation, 0% keeps the resource on the route and lets a hub export it, see propagation routes.
+        # Changed allocations of planned pairs never get here, they are one setTradeRoute over the route above.
+        if not {'imports', 'exports'}.isdisjoint(route.raw.keys()):
+            if route.export_tech and route.partner not in tech_importers:
+                calls.append((SET_TRADE_ROUTE, route.partner, route.owner, 'tech', route.export_tech, None))
+                description += ', uplift to %d recreated' % route.export_tech
+            elif route.import_tech and route.owner not in tech_importers:
+                calls.append((SET_TRADE_ROUTE, route.owner, route.partner, 'tech', route.import_tech, None))
+                description += ', uplift to %d recreated' % route.import_tech
+
+        mutations.append(Mutation(PRIORITY_CLEANUP, calls, description))
+
+    mutations.sort(key=lambda x: x.priority)
+    return mutations
+
+
+def cost(mutations: list) -> dict:
+    calls = [call[0] for x in mutations for call in x.calls]
+    return {
+        SET_TRADE_ROUTE: calls.count(SET_TRADE_ROUTE),
+        STOP_TRADE_ROUTE: calls.count(STOP_TRADE_ROUTE),
+    }
+
+
+def print_plan(mutations: list, resumed: list = ()):
+    # resumed are journal groups left by an interrupted run, see planner.journal.reconcile()
+    if resumed:
+        print('\nResumed: %d mutations' % len(resumed))
+        for x in resumed:
+            print('  [%d calls] %s' % (len(x.calls), x.description))
+
+    print('\nPlan: %d mutations' % len(mutations))
+    for x in mutations:
+        print('  [%d calls] %s' % (len(x.calls), x.description))
+
+    calls = cost(list(resumed) + mutations)
+    windows = math.ceil(max(calls.values()) / RATE_LIMIT) if mutations or resumed else 0
+    print('\nAPI cost: %d setTradeRoute, %d stopTradeRoute (%d rate limit windows of %d/hr)' %
+          (calls[SET_TRADE_ROUTE], calls[STOP_TRADE_ROUTE], windows, RATE_LIMIT))
+
+
+def apply(mutations: list, scheduler: MutationScheduler) -> list:
+    for x in mutations:
+        scheduler.submit(x.priority, x.calls, x.description)
+    return scheduler.run()
@@ -0,0 +1,119 @@
+import copy
+import itertools
+import json
+import math
+import os
+import sys
+
+
+class ReplayApi:
+    # Offline api backend with the same surface the planner uses.
+    # State is loaded from a stored snapshot, mutations change in-memory objects only.
+    def __init__(self, game_info: dict, game_objects: list):
+        self.game_info = game_info
+        self.game_objects = copy.deepcopy(game_objects)
+        self.objects_dict = {x['id']: x for x in self.game_objects if isinstance(x, dict) and 'id' in x}
+        self.scenario_info = {x['id']: x for x in game_info.get('scenarioInfo', [])}
+        self.gameID = game_info.get('gameID')
+        self.sovID = game_info.get('userInfo', {}).get('sovereignID')
+        self.mutations = []
+
+    @classmethod
+    def from_json(cls, path: str) -> 'ReplayApi':
+        # same layout as GameData: {"gameInfo": {...}, "gameObjects": [...]}
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['gameInfo'], data['gameObjects'])
+
+    @classmethod
+    def from_game_data(cls, snapshot_id: int) -> 'ReplayApi':
+        anatools_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'anatools')
+        if anatools_dir not in sys.path:
+            sys.path.append(anatools_dir)
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'anatools.settings')
+        import django
+        django.setup()
+        from app.anacreon.models import GameData
+
+        game_info, game_objects = GameData.objects.get(id=snapshot_id).full_data()
+        return cls(game_info, game_objects)
+
+    @classmethod
+    def load(cls, source: str) -> 'ReplayApi':
+        # 'gamedata:<id>' or path to a json file
+        if source.startswith('gamedata:'):
+            return cls.from_game_data(int(source.split(':', 1)[1]))
+        return cls.from_json(source)
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump({'gameInfo': self.game_info, 'gameObjects': self.game_objects, 'mutations': self.mutations}, f)
+
+    # read api
+
+    def get_game_list(self) -> list:
+        return []
+
+    def get_game_info(self) -> dict:
+        return self.game_info
+
+    def get_objects(self) -> list:
+        return self.game_objects
+
+    def get_obj_by_id(self, id: int) -> dict:
+        return self.objects_dict.get(id)
+
+    @staticmethod
+    def dist(pos1, pos2) -> float:
+        return math.hypot(pos1[0] - pos2[0], pos1[1] - pos2[1])
+
+    # mutations
+
+    def _find_route(self, world_id: int, partner_id: int) -> dict:
+        return next((x for x in self.objects_dict[world_id].get('tradeRoutes', [])
+                     if x['partnerObjID'] == partner_id), None)
+
+    def _owned_route(self, importer: int, exporter: int) -> tuple:
+        # route data and whether importer is the side that owns it
+        route = self._find_route(importer, exporter)
+        if route is None:
+            route = {'partnerObjID': exporter}
+            self.objects_dict[importer].setdefault('tradeRoutes', []).append(route)
+            self.objects_dict[exporter].setdefault('tradeRoutes', []).append({'partnerObjID': importer, 'return': True})
+        if 'return' in route.keys():
+            return self._find_route(exporter, importer), False
+        return route, True
+
+    @staticmethod
+    def _set_allocation(route: dict, key: str, resource: int, value: float):
+        data = route.setdefault(key, [])
+        for i in range(0, len(data) - 3, 4):
+            if data[i] == resource:
+                data[i + 1] = value
+                return
+        data.extend([resource, value, 0, 0])
+
+    def _demand(self, world: dict) -> set:
+        needs = set(world.get('baseConsumption', [])[::3])
+        production = list(itertools.chain(*[x['productionData'] for x in world.get('traits', [])
+                                            if type(x) is dict and 'productionData' in x]))
+        needs.update(res for i, res in enumerate(production[::3]) if production[i * 3 + 1] < 0)
+        return needs
+
+    def set_trade_route(self, importer: int, exporter: int, alloc_type, alloc_value: float = None,
+                        res_type: int = None):
+        self.mutations.append(['set_trade_route', importer, exporter, alloc_type, alloc_value, res_type])
+        route, owned = self._owned_route(importer, exporter)
+        if alloc_type == 'consumption':
+            self._set_allocation(route, 'imports' if owned else 'exports', res_type, alloc_value)
+        elif alloc_type == 'tech':
+            route['importTech' if owned else 'exportTech'] = [alloc_value]
+        elif alloc_type == 'addDefaultRoute':
+            for resource in self._demand(self.objects_dict[importer]):
+                self._set_allocation(route, 'imports' if owned else 'exports', resource, 100)
+
+    def stop_trade_route(self, world_id: int, partner_id: int):
+        self.mutations.append(['stop_trade_route', world_id, partner_id])
+        for a, b in ((world_id, partner_id), (partner_id, world_id)):
+            routes = self.objects_dict[a].get('tradeRoutes', [])
+            routes[:] = [x for x in routes if x['partnerObjID'] != b]
@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+
+def decode_allocations(data: list) -> dict:
+    # imports/exports are flat arrays of [resourceID, allocation, ?, ?] groups
+    return {data[i]: data[i + 1] for i in range(0, len(data) - 3, 4)}
+
+
+class RouteRecord:
+    __slots__ = ('owner', 'partner', 'imports', 'exports', 'import_tech', 'export_tech', 'raw')
+
+    # Route data belongs to the owner world, partner only has a 'return' stub.
+    # imports/exports are owner's point of view.
+    def __init__(self, owner: int, partner: int, route: dict = None):
+        route = route or {}
+        self.owner = owner
+        self.partner = partner
+        self.imports = decode_allocations(route.get('imports', []))
+        self.exports = decode_allocations(route.get('exports', []))
+        self.import_tech = route['importTech'][0] if route.get('importTech') else None
+        self.export_tech = route['exportTech'][0] if route.get('exportTech') else None
+        self.raw = route
+
+    def __repr__(self):
+        return '<RouteRecord %s <-> %s>' % (self.owner, self.partner)
+
+    def has_trade(self) -> bool:
+        return bool(self.imports or self.exports)
+
+
+class RouteIndex:
+    def __init__(self, objects: dict = None):
+        self.routes = defaultdict(dict)  # world id -> partner id -> record
+        if objects:
+            self.build(objects)
+
+    def build(self, objects: dict):
+        self.routes.clear()
+        for obj in objects.values():
+            for route in obj.get('tradeRoutes', []):
+                if 'return' in route.keys():
+                    continue  # this route is indexed from the partner side
+                self._add(RouteRecord(obj['id'], route['partnerObjID'], route))
+
+    def _add(self, record: RouteRecord) -> RouteRecord:
+        self.routes[record.owner][record.partner] = record
+        self.routes[record.partner][record.owner] = record
+        return record
+
+    def get(self, world_id: int, partner_id: int) -> RouteRecord:
+        return self.routes.get(world_id, {}).get(partner_id)
+
+    def partners(self, world_id: int) -> list:
+        return list(self.routes.get(world_id, {}))
+
+    def records(self) -> list:
+        return list({id(x): x for partners in self.routes.values() for x in partners.values()}.values())
+
+    def imports(self, world_id: int, partner_id: int) -> dict:
+        route = self.get(world_id, partner_id)
+        if not route:
+            return {}
+        return route.imports if route.owner == world_id else route.exports
+
+    def exports(self, world_id: int, partner_id: int) -> dict:
+        route = self.get(world_id, partner_id)
+        if not route:
+            return {}
+        return route.exports if route.owner == world_id else route.imports
+
+    def import_tech(self, world_id: int, partner_id: int):
+        route = self.get(world_id, partner_id)
+        if not route:
+            return None
+        return route.import_tech if route.owner == world_id else route.export_tech
+
+    def is_route_present(self, world_id: int, partner_id: int, alloc_type: str, alloc_value: float = None,
+                         res_type: int = None) -> bool:
+        if alloc_type == 'importTech':
+            level = self.import_tech(world_id, partner_id)
+            return level is not None and int(level) == alloc_value
+
+        allocations = self.imports(world_id, partner_id) if alloc_type == 'imports' \
+            else self.exports(world_id, partner_id)
+        return res_type in allocations and int(allocations[res_type]) == alloc_value
+
+    # keep index in sync with mutations sent to the server
+
+    def apply_set(self, importer: int, exporter: int, alloc_type: str, alloc_value: float = None,
+                  res_type: int = None):
+        route = self.get(importer, exporter) or self._add(RouteRecord(importer, exporter))
+        if alloc_type == 'consumption':
+            allocations = route.imports if route.owner == importer else route.exports
+            allocations[res_type] = alloc_value
+        elif alloc_type == 'tech':
+            if route.owner == importer:
+                route.import_tech = alloc_value
+            else:
+                route.export_tech = alloc_value
+        # addDefaultRoute: server decides what gets imported, we only know the route exists
+
+    def apply_stop(self, world_id: int, partner_id: int):
+        self.routes.get(world_id, {}).pop(partner_id, None)
+        self.routes.get(partner_id, {}).pop(world_id, None)
@@ -0,0 +1,76 @@
+import contextlib
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from planner.plan import cost
+from planner.scheduler import SET_TRADE_ROUTE, STOP_TRADE_ROUTE
+
+
+def target_name(target: dict) -> str:
+    name = target.get('name') or '%s-%s' % (target['login'], target['game'])
+    return re.sub(r'[^\w.-]', '_', str(name))
+
+
+def run_target(target: dict, options: dict, log_dir: str = None) -> dict:
+    # Runs in a worker process: fetch, planning and applying of one target. Its budget, plan cache and
+    # other state files get the target name as a suffix, output goes to the target log.
+    import create_trade_routes
+
+    name = target_name(target)
+    log_path = os.path.join(log_dir, name + '.log') if log_dir else os.devnull
+    summary = {'target': name, 'log': log_path}
+    start = time.perf_counter()
+    with open(log_path, 'w') as log, contextlib.redirect_stdout(log):
+        try:
+            metrics = create_trade_routes.Metrics('planner')
+            api = create_trade_routes.connect(target['login'], target['password'], target['game'], metrics)
+            result = create_trade_routes.run(api, create_trade_routes.state_files('-' + name), metrics=metrics,
+                                             login=target['login'], **options)
+            summary.update(mutations=len(result.mutations), cost=cost(result.mutations),
+                           deferred=len(result.deferred), requests=result.requests)
+        except Exception as e:
+            traceback.print_exc(file=log)
+            summary['error'] = '%s: %s' % (e.__class__.__name__, e)
+    summary['time'] = time.perf_counter() - start
+    return summary
+
+
+def print_summary(results: list, wall_time: float):
+    print('\n%-30s %8s %10s %10s %9s %8s' % ('Target', 'Time', 'Planned', 'Requests', 'Deferred', 'Status'))
+    for x in sorted(results, key=lambda x: x['target']):
+        if 'error' in x:
+            print('%-30s %7.1fs %10s %10s %9s   %s' % (x['target'], x['time'], '-', '-', '-', x['error']))
+            continue
+        requests = x['requests'].get(SET_TRADE_ROUTE, 0) + x['requests'].get(STOP_TRADE_ROUTE, 0)
+        planned = x['cost'][SET_TRADE_ROUTE] + x['cost'][STOP_TRADE_ROUTE]
+        print('%-30s %7.1fs %10d %10d %9d %8s' % (x['target'], x['time'], planned, requests, x['deferred'], 'ok'))
+
+    failed = sum('error' in x for x in results)
+    print('\n%d targets, %d failed, wall time %.1fs (sum of targets %.1fs)' %
+          (len(results), failed, wall_time, sum(x['time'] for x in results)))
+
+
+def run_targets(targets: list, options: dict, workers: int = None, log_dir: str = 'trade_routes_logs') -> list:
+    # every target is planned in its own process, so the whole run takes as long as the slowest target
+    if not targets:
+        print('No targets to plan')
+        return []
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    workers = workers or min(len(targets), os.cpu_count() or 1)
+    print('Planning %d targets in %d processes' % (len(targets), workers))
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_target, x, options, log_dir) for x in targets]
+        for future in as_completed(futures):
+            summary = future.result()
+            results.append(summary)
+            print('%s: %s in %.1fs' % (summary['target'], summary.get('error', 'done'), summary['time']))
+
+    print_summary(results, time.perf_counter() - start)
+    return results
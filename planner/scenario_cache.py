@@ -0,0 +1,57 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+
+from planner.catalog import ScenarioCatalog
+
+MAX_AGE = 24 * 60 * 60  # refetch at least once a day, scenario can change between game versions
+
+
+def scenario_hash(scenario_info: dict) -> str:
+    return hashlib.sha1(json.dumps(sorted(scenario_info.items()), sort_keys=True).encode()).hexdigest()
+
+
+class ScenarioCache:
+    # Indexed scenario of every game, pickled between runs. Scenario is a part of getGameInfo response
+    # and almost never changes, so a fresh entry lets the planner start with the objects fetch.
+    def __init__(self, path: str = None, max_age: float = MAX_AGE, clock=time.time):
+        self.path = path
+        self.max_age = max_age
+        self.clock = clock
+        self.games = {}  # 'login@game id' -> {'hash', 'sov_id', 'catalog', 'saved'}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    self.games = pickle.load(f)
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+                print('Scenario cache is unreadable, ignoring it: %s' % e)
+
+    @staticmethod
+    def key(login: str, game_id) -> str:
+        # sovereign id comes with the entry, it is different for every login in the same game
+        return '%s@%s' % (login, game_id)
+
+    def get(self, login: str, game_id) -> dict:
+        entry = self.games.get(self.key(login, game_id))
+        if entry is None or self.clock() - entry['saved'] > self.max_age:
+            return None
+        return entry
+
+    def put(self, login: str, game_id, sov_id: int, scenario_info: dict) -> ScenarioCatalog:
+        digest = scenario_hash(scenario_info)
+        entry = self.games.get(self.key(login, game_id))
+        if entry is None or entry['hash'] != digest:
+            entry = {'hash': digest, 'catalog': ScenarioCatalog(scenario_info)}
+        entry.update(sov_id=sov_id, saved=self.clock())
+        self.games[self.key(login, game_id)] = entry
+        self.save()
+        return entry['catalog']
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path + '.tmp', 'wb') as f:
+            pickle.dump(self.games, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + '.tmp', self.path)
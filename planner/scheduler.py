@@ -0,0 +1,180 @@
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import deque
+
+RATE_LIMIT = 120  # mutations per hour, enforced by the server for each of setTradeRoute and stopTradeRoute
+RATE_PERIOD = 60 * 60
+
+# lower value goes first
+PRIORITY_RESUME = -1  # rest of a group interrupted in the previous run, see planner.journal
+PRIORITY_IMPORT = 0
+PRIORITY_EXPORT = 1
+PRIORITY_TECH = 2
+PRIORITY_PROPAGATION = 3
+PRIORITY_CLEANUP = 4
+
+SET_TRADE_ROUTE = 'setTradeRoute'
+STOP_TRADE_ROUTE = 'stopTradeRoute'
+
+
+class CallWindow:
+    # Times of successful calls during the last period, server allows limit of them in any window
+    # of that length. Same model as the server and planner.fake.FakeApi, a burst doesn't refill.
+    def __init__(self, limit: int = RATE_LIMIT, period: float = RATE_PERIOD, clock=time.time, calls: list = ()):
+        self.limit = limit
+        self.period = period
+        self.clock = clock
+        self.calls = deque(sorted(calls))
+
+    def expire(self):
+        while self.calls and self.calls[0] <= self.clock() - self.period:
+            self.calls.popleft()
+
+    def available(self) -> int:
+        self.expire()
+        return max(0, self.limit - len(self.calls))
+
+    def record(self):
+        self.calls.append(self.clock())
+
+    def to_list(self) -> list:
+        self.expire()
+        return list(self.calls)
+
+
+class Budget:
+    # one window per rate limited endpoint, persisted between runs
+    def __init__(self, path: str = None, limit: int = RATE_LIMIT, period: float = RATE_PERIOD, clock=time.time):
+        self.path = path
+        self.clock = clock
+        state = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+        self.windows = {
+            x: CallWindow(limit, period, clock, state.get('calls', {}).get(x, []))
+            for x in (SET_TRADE_ROUTE, STOP_TRADE_ROUTE)
+        }
+
+    def available(self, method: str) -> int:
+        return self.windows[method].available()
+
+    def can_afford(self, calls: list) -> bool:
+        needed = {}
+        for method, *_ in calls:
+            needed[method] = needed.get(method, 0) + 1
+        return all(self.available(x) >= n for x, n in needed.items())
+
+    def record(self, method: str):
+        self.windows[method].record()
+
+    def exhaust(self, method: str):
+        # server says the limit is reached, calls made outside of this budget count against it too
+        window = self.windows[method]
+        while window.available():
+            window.record()
+
+    def save(self):
+        if not self.path:
+            return
+        state = {'calls': {x: window.to_list() for x, window in self.windows.items()}}
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(self.path + '.tmp', self.path)
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    # server rejects calls over the limit with an error that mentions it
+    return 'limit' in str(e).lower()
+
+
+class MutationScheduler:
+    # Planner submits mutations here instead of calling the api. They are executed by priority
+    # in run(), as long as the budget allows, everything else is left for the next run.
+    # Listeners (route indexes) are notified on submit, so the rest of the planning sees intended state.
+    # With a journal every group is logged before and while it is executed, so a crash can be recovered from.
+    def __init__(self, api, budget: Budget, errors: tuple = (Exception,), journal=None):
+        self.api = api
+        self.budget = budget
+        self.errors = errors
+        self.journal = journal
+        self.queue = []
+        self.seq = itertools.count()
+        self.set_listeners = []
+        self.stop_listeners = []
+        self.executed = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def set_trade_route(self, priority: int, importer: int, exporter: int, alloc_type, alloc_value: float = None,
+                        res_type: int = None, description: str = ''):
+        call = (SET_TRADE_ROUTE, importer, exporter, alloc_type, alloc_value, res_type)
+        self.submit(priority, [call], description)
+
+    def stop_trade_route(self, priority: int, world_id: int, partner_id: int, description: str = ''):
+        self.submit(priority, [(STOP_TRADE_ROUTE, world_id, partner_id)], description)
+
+    def submit(self, priority: int, calls: list, description: str = '', group: int = None, offset: int = 0):
+        # calls in one submit are executed together or not at all,
+        # group and offset continue a journal group from its call number offset
+        heapq.heappush(self.queue, (priority, next(self.seq), calls, description, group, offset))
+        for method, *args in calls:
+            for listener in (self.set_listeners if method == SET_TRADE_ROUTE else self.stop_listeners):
+                listener(*args)
+
+    def _call(self, method: str, *args):
+        if method == SET_TRADE_ROUTE:
+            return self.api.set_trade_route(*args)
+        return self.api.stop_trade_route(*args)
+
+    def run(self):
+        deferred = []
+
+        def defer(priority, calls, description):
+            deferred.append({'priority': priority, 'calls': calls, 'description': description})
+
+        while self.queue:
+            priority, _, calls, description, group, offset = heapq.heappop(self.queue)
+            if not self.budget.can_afford(calls):
+                defer(priority, calls, description)
+                continue  # journal group of a resumed mutation stays open for the next run
+
+            if self.journal is not None and group is None:
+                group = self.journal.begin(priority, calls, description)
+            rate_limited = False
+            for i, (method, *args) in enumerate(calls):
+                try:
+                    self._call(method, *args)
+                except self.errors as e:
+                    if is_rate_limit_error(e):
+                        # nothing else will get through until the window moves, the rest waits for the next run
+                        print('\n%s rate limited: %s\n%s' % (method, description, e))
+                        self.budget.exhaust(method)
+                        rate_limited = True
+                        defer(priority, calls[i:], description)
+                        break
+                    self.failed += 1
+                    print('\n%s failed: %s\n%s\n%s' % (method, description, e.__class__, e))
+                    break  # don't run the rest of the group, e.g. recreate after a failed stop
+                self.executed += 1
+                self.budget.record(method)  # only calls that went through count against the limit
+                self.budget.save()
+                if group is not None:
+                    self.journal.done(group, offset + i)
+            if group is not None and not (rate_limited and (i > 0 or offset > 0)):
+                # a group cut by the rate limit halfway is resumed by the next run, a resumed group is halfway
+                # even if none of its remaining calls got through
+                self.journal.end(group)
+
+        self.budget.save()
+
+        print('\nMutations: %d executed, %d failed, %d deferred to the next run' %
+              (self.executed, self.failed, len(deferred)))
+        for x in deferred:
+            print('  deferred: %s' % x['description'])
+        return deferred
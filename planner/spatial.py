@@ -0,0 +1,141 @@
+import heapq
+import math
+from collections import defaultdict
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, grid backend works without it
+    numpy = None
+
+
+TRADE_RANGE = 100
+SPACEPORT_TRADE_RANGE = 200
+ADMIN_RANGE = 250
+
+
+def dist(pos1, pos2) -> float:
+    return math.hypot(pos1[0] - pos2[0], pos1[1] - pos2[1])
+
+
+def position(obj) -> tuple:
+    # indexes take raw world objects and planner.model.World alike
+    return obj['pos'] if isinstance(obj, dict) else obj.pos
+
+
+class GridIndex:
+    # Objects are put into square buckets of cell_size, so a radius query
+    # only looks at buckets that intersect the query circle.
+    def __init__(self, objects: list, cell_size: float = TRADE_RANGE):
+        self.cell_size = cell_size
+        self.objects = list(objects)
+        self.cells = defaultdict(list)
+        for obj in self.objects:
+            self.cells[self._cell(position(obj))].append(obj)
+
+        if self.cells:
+            xs = [cx for cx, _ in self.cells]
+            ys = [cy for _, cy in self.cells]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+
+    def __len__(self):
+        return len(self.objects)
+
+    def _cell(self, pos) -> tuple:
+        return int(math.floor(pos[0] / self.cell_size)), int(math.floor(pos[1] / self.cell_size))
+
+    def _ring(self, center: tuple, k: int):
+        cx, cy = center
+        if k == 0:
+            yield center
+            return
+        for x in range(cx - k, cx + k + 1):
+            yield x, cy - k
+            yield x, cy + k
+        for y in range(cy - k + 1, cy + k):
+            yield cx - k, y
+            yield cx + k, y
+
+    def within(self, pos, radius: float) -> list:
+        if not self.cells:
+            return []
+
+        x0, y0 = self._cell((pos[0] - radius, pos[1] - radius))
+        x1, y1 = self._cell((pos[0] + radius, pos[1] + radius))
+        # don't walk empty buckets outside of the populated area
+        x0, y0 = max(x0, self.bounds[0]), max(y0, self.bounds[1])
+        x1, y1 = min(x1, self.bounds[2]), min(y1, self.bounds[3])
+
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for obj in self.cells.get((cx, cy), ()):
+                    d = dist(position(obj), pos)
+                    if d <= radius:
+                        found.append((d, obj))
+        found.sort(key=lambda x: x[0])
+        return [obj for _, obj in found]
+
+    def nearest(self, pos, n: int = 1) -> list:
+        n = min(n, len(self.objects))
+        if n <= 0:
+            return []
+
+        center = self._cell(pos)
+        # number of rings needed to cover every bucket from the query cell
+        max_ring = max(abs(center[0] - self.bounds[0]), abs(center[0] - self.bounds[2]),
+                       abs(center[1] - self.bounds[1]), abs(center[1] - self.bounds[3]))
+
+        found = []
+        for k in range(max_ring + 1):
+            for cell in self._ring(center, k):
+                for obj in self.cells.get(cell, ()):
+                    found.append((dist(position(obj), pos), obj))
+            # after ring k everything closer than k * cell_size has been seen
+            if len(found) >= n and heapq.nsmallest(n, (d for d, _ in found))[-1] <= k * self.cell_size:
+                break
+        found.sort(key=lambda x: x[0])
+        return [obj for _, obj in found[:n]]
+
+
+class NumpyIndex:
+    # Brute force over a contiguous coordinates array. Faster than the grid
+    # for small object counts and when many queries are done in one batch.
+    def __init__(self, objects: list):
+        self.objects = list(objects)
+        self.positions = numpy.array([position(obj) for obj in self.objects], dtype=float).reshape(-1, 2)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def distances(self, pos):
+        return numpy.hypot(self.positions[:, 0] - pos[0], self.positions[:, 1] - pos[1])
+
+    def distance_matrix(self, positions) -> 'numpy.ndarray':
+        positions = numpy.asarray(positions, dtype=float).reshape(-1, 2)
+        delta = positions[:, None, :] - self.positions[None, :, :]
+        return numpy.hypot(delta[..., 0], delta[..., 1])
+
+    def within(self, pos, radius: float) -> list:
+        if not self.objects:
+            return []
+        distances = self.distances(pos)
+        indices = numpy.flatnonzero(distances <= radius)
+        indices = indices[numpy.argsort(distances[indices], kind='stable')]
+        return [self.objects[i] for i in indices]
+
+    def nearest(self, pos, n: int = 1) -> list:
+        if not self.objects:
+            return []
+        distances = self.distances(pos)
+        indices = numpy.argsort(distances, kind='stable')[:n]
+        return [self.objects[i] for i in indices]
+
+
+def build_index(objects: list, backend: str = 'grid', cell_size: float = TRADE_RANGE):
+    if backend == 'numpy':
+        if numpy is None:
+            raise ImportError('numpy backend requested, but numpy is not installed')
+        return NumpyIndex(objects)
+    if backend == 'grid':
+        return GridIndex(objects, cell_size)
+    raise ValueError('Unknown spatial index backend: %s' % backend)
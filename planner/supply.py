@@ -0,0 +1,51 @@
+from collections import defaultdict
+
+from planner.routes import RouteIndex
+
+
+class SupplyIndex:
+    # resource -> hub id -> ids of producer worlds (not hubs) that export it to the hub.
+    # Hubs can only export what they import, so offers[hub id] is the hub's 'can_export' set;
+    # the same set object is shared with hub dicts and is kept up to date by the index.
+    def __init__(self):
+        self.supply = defaultdict(lambda: defaultdict(set))
+        self.offers = defaultdict(set)
+        self.hub_ids = set()
+
+    def build(self, routes: RouteIndex, hub_ids: set):
+        self.supply.clear()
+        self.hub_ids = set(hub_ids)
+        for hub_id in self.hub_ids:
+            self.offers[hub_id].clear()
+            for partner_id in routes.partners(hub_id):
+                for resource in routes.imports(hub_id, partner_id):
+                    self._add(hub_id, partner_id, resource)
+
+    def _add(self, hub_id: int, exporter_id: int, resource: int):
+        if exporter_id in self.hub_ids:
+            return  # routes between hubs are managed by player
+        self.supply[resource][hub_id].add(exporter_id)
+        self.offers[hub_id].add(resource)
+
+    def exporters(self, hub_id: int, resource: int) -> set:
+        return self.supply.get(resource, {}).get(hub_id, set())
+
+    def can_export(self, hub_id: int) -> set:
+        return self.offers[hub_id]
+
+    # keep index in sync with mutations sent to the server
+
+    def apply_set(self, importer: int, exporter: int, alloc_type: str, alloc_value: float = None,
+                  res_type: int = None):
+        if alloc_type == 'consumption' and importer in self.hub_ids:
+            self._add(importer, exporter, res_type)
+
+    def apply_stop(self, world_id: int, partner_id: int):
+        for hub_id, exporter_id in ((world_id, partner_id), (partner_id, world_id)):
+            if hub_id not in self.hub_ids:
+                continue
+            for resource in list(self.offers[hub_id]):
+                exporters = self.supply[resource][hub_id]
+                exporters.discard(exporter_id)
+                if not exporters:
+                    self.offers[hub_id].discard(resource)
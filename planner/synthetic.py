@@ -0,0 +1,139 @@
+import json
+import math
+import random
+
+from planner.spatial import TRADE_RANGE, build_index
+
+# ids of the generated scenario, real scenarios use larger and sparser ids
+HUB, UNIVERSITY, CAPITAL = 1, 2, 3
+INDUSTRY_DESIGNATIONS = range(10, 20)
+SPACEPORT = 50
+INDUSTRY_TRAITS = range(60, 80)
+COMMODITIES = range(100, 140)
+LIFE_SUPPORT = {'core.airFilters': 140, 'core.radiationMeds': 141, 'core.radiationShielding': 142,
+                'core.lifeSupportSupplies': 143}
+UNITS = range(200, 210)
+
+WORLD_SPACING = 40  # average distance between worlds, keeps density the same for any world count
+
+
+def scenario() -> list:
+    # every entry has a category, like in real scenarios: the original planner reads it for everything in buildData
+    info = [
+        {'id': HUB, 'unid': 'core.tradingHubDesignation', 'nameDesc': 'trading hub', 'category': 'designation'},
+        {'id': UNIVERSITY, 'unid': 'core.universityDesignation', 'nameDesc': 'university', 'category': 'designation'},
+        {'id': CAPITAL, 'unid': 'core.capitalDesignation', 'nameDesc': 'imperial capital', 'role': 'imperialCapital',
+         'category': 'designation'},
+        {'id': SPACEPORT, 'unid': 'core.spaceport', 'nameDesc': 'spaceport', 'role': 'spaceport',
+         'category': 'improvement'},
+    ]
+    info += [{'id': x, 'unid': 'synthetic.designation%d' % x, 'nameDesc': 'industry %d' % x, 'category': 'designation'}
+             for x in INDUSTRY_DESIGNATIONS]
+    info += [{'id': x, 'unid': 'synthetic.trait%d' % x, 'nameDesc': 'trait %d' % x, 'category': 'industry'}
+             for x in INDUSTRY_TRAITS]
+    info += [{'id': x, 'unid': 'synthetic.commodity%d' % x, 'nameDesc': 'commodity %d' % x, 'category': 'commodity'}
+             for x in COMMODITIES]
+    info += [{'id': id, 'unid': unid, 'nameDesc': unid.split('.')[1], 'category': 'commodity'}
+             for unid, id in LIFE_SUPPORT.items()]
+    info += [{'id': x, 'unid': 'synthetic.unit%d' % x, 'nameDesc': 'unit %d' % x, 'category': 'maneuveringUnit'}
+             for x in UNITS]
+    return info
+
+
+def triplets(items) -> list:
+    return [x for item in items for x in item]
+
+
+def industry_trait(rnd: random.Random, primary: bool) -> dict:
+    produced = rnd.sample(COMMODITIES, rnd.randint(1, 3))
+    consumed = rnd.sample(COMMODITIES, rnd.randint(0, 3))
+    return {
+        'traitID': rnd.choice(INDUSTRY_TRAITS),
+        'isPrimary': primary,
+        # [resource, quantity, ?], negative quantity means consumed
+        'productionData': triplets([(x, rnd.randint(10, 500), 0) for x in produced] +
+                                   [(x, -rnd.randint(10, 500), 0) for x in consumed]),
+        # [resource, ?, cannotBuild]
+        'buildData': triplets([(x, 1, int(rnd.random() < 0.1)) for x in produced] +
+                              [(x, 1, 0) for x in rnd.sample(UNITS, rnd.randint(0, 2))]),
+    }
+
+
+def world(rnd: random.Random, id: int, pos: list, designation: int, sov_id: int) -> dict:
+    traits = [industry_trait(rnd, True)] + [industry_trait(rnd, False) for _ in range(rnd.randint(0, 2))]
+    if rnd.random() < 0.2:
+        traits.append(SPACEPORT)
+    return {
+        'id': id,
+        'class': 'world',
+        'name': 'World %d' % id,
+        'sovereignID': sov_id,
+        'designation': designation,
+        'techLevel': rnd.randint(3, 9),
+        'pos': pos,
+        'traits': traits,
+        'baseConsumption': triplets((x, rnd.randint(1, 50), 0)
+                                    for x in rnd.sample(list(COMMODITIES) + list(LIFE_SUPPORT.values()), 4)),
+        'tradeRoutes': [],
+    }
+
+
+def add_route(importer: dict, exporter: dict, **data):
+    # route data is kept by one side, the other one has a 'return' stub
+    importer['tradeRoutes'].append(dict(partnerObjID=exporter['id'], **data))
+    exporter['tradeRoutes'].append({'partnerObjID': importer['id'], 'return': True})
+
+
+def generate(worlds: int = 1000, hub_density: float = 0.05, fond_density: float = 0.02,
+             capital_density: float = 0.005, route_density: float = 0.7, foreign: float = 0.2,
+             sov_id: int = 1, seed: int = 0) -> tuple:
+    # (gameInfo, gameObjects) in the layout of stored snapshots, see ReplayApi
+    rnd = random.Random(seed)
+    side = math.sqrt(worlds) * WORLD_SPACING
+
+    objects = []
+    for id in range(1, worlds + 1):
+        roll = rnd.random()
+        if roll < capital_density:
+            designation = CAPITAL
+        elif roll < capital_density + hub_density:
+            designation = HUB
+        elif roll < capital_density + hub_density + fond_density:
+            designation = UNIVERSITY
+        else:
+            designation = rnd.choice(INDUSTRY_DESIGNATIONS)
+        owner = sov_id if rnd.random() >= foreign else sov_id + 1 + rnd.randrange(5)
+        objects.append(world(rnd, id, [rnd.uniform(-side, side) / 2, rnd.uniform(-side, side) / 2], designation,
+                             owner))
+
+    # existing routes: producers trade with a random hub nearby, some of them get tech from a university
+    mine = [x for x in objects if x['sovereignID'] == sov_id]
+    hubs = [x for x in mine if x['designation'] == HUB]
+    fonds = [x for x in mine if x['designation'] == UNIVERSITY]
+    hubs_index = build_index(hubs, cell_size=TRADE_RANGE)
+    fonds_index = build_index(fonds, cell_size=TRADE_RANGE)
+    for obj in mine:
+        if obj['designation'] in (HUB, UNIVERSITY) or rnd.random() >= route_density:
+            continue
+        nearby = hubs_index.within(obj['pos'], TRADE_RANGE)
+        if nearby:
+            hub = rnd.choice(nearby)  # not always the closest one, so planner has something to fix
+            exports = obj['traits'][0]['buildData'][::3]
+            add_route(obj, hub,
+                      imports=triplets((x, 100, 0, 0) for x in obj['baseConsumption'][::3][:2]),
+                      exports=triplets((x, 100, 0, 0) for x in exports if x in COMMODITIES))
+        nearby = fonds_index.within(obj['pos'], TRADE_RANGE)
+        if nearby:
+            add_route(obj, nearby[0], importTech=[nearby[0]['techLevel']])
+
+    game_info = {
+        'gameID': 'synthetic-%d-%d' % (worlds, seed),
+        'userInfo': {'sovereignID': sov_id},
+        'scenarioInfo': scenario(),
+    }
+    return game_info, objects
+
+
+def save(path: str, game_info: dict, game_objects: list):
+    with open(path, 'w') as f:
+        json.dump({'gameInfo': game_info, 'gameObjects': game_objects}, f)
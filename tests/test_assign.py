@@ -0,0 +1,41 @@
+import unittest
+
+from planner import synthetic
+from planner.assign import optimize
+from planner.catalog import ScenarioCatalog
+from planner.model import Galaxy
+from planner.routes import RouteIndex
+from planner.spatial import build_index
+from planner.supply import SupplyIndex
+
+
+class OptimizeTest(unittest.TestCase):
+    def setUp(self):
+        game_info, objects = synthetic.generate(300, seed=5)
+        self.galaxy = Galaxy(objects, ScenarioCatalog({x['id']: x for x in game_info['scenarioInfo']}), 1)
+        self.worlds = self.galaxy.owned_by(1)
+        hubs = [x for x in self.worlds if x.is_hub]
+        fonds = [x for x in self.worlds if x.is_university]
+        self.hubs_index, self.fonds_index = build_index(hubs), build_index(fonds)
+        self.routes = RouteIndex({x['id']: x for x in objects if isinstance(x, dict) and 'id' in x})
+        self.supply = SupplyIndex()
+        self.supply.build(self.routes, {x.id for x in hubs})
+
+    def optimize(self, hub_capacity: int = None):
+        return optimize(self.worlds, self.hubs_index, self.fonds_index, self.galaxy, self.routes, self.supply,
+                        hub_capacity)
+
+    def test_worlds_left_without_hub_are_unmet(self):
+        free = self.optimize()
+        self.assertEqual(free.unassigned, [])
+
+        limited = self.optimize(hub_capacity=1)
+        self.assertTrue(limited.unassigned)
+        self.assertTrue(set(limited.unassigned).isdisjoint(limited.hubs))
+        self.assertEqual(len(limited.hubs) + len(limited.unassigned), len(free.hubs))
+        self.assertGreaterEqual(limited.unmet, sum(len(self.galaxy[x].needs) for x in limited.unassigned))
+        self.assertGreater(limited.unmet, free.unmet)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import contextlib
+import io
+import threading
+import unittest
+
+from lib.standin import api_url, make_server
+from planner import synthetic
+
+try:
+    from lib.anacreonlib import anacreon
+    from lib.client import AnacreonClient, pooled_session
+except ImportError:  # lib/anacreonlib is a git submodule
+    AnacreonClient = None
+
+
+@unittest.skipIf(AnacreonClient is None, 'lib/anacreonlib is not checked out')
+class ReloginTest(unittest.TestCase):
+    def setUp(self):
+        game_info, objects = synthetic.generate(50, seed=6)
+        self.server = make_server({1: {'gameInfo': game_info, 'objects': objects}})
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self, game_id: int) -> AnacreonClient:
+        return AnacreonClient('first', 'password', game_id, pooled_session(1, api_url(self.server)))
+
+    def test_rejected_token_logs_in_again(self):
+        client = self.client(1)
+        client.connect().auth_token = 'expired'
+        with contextlib.redirect_stdout(io.StringIO()):
+            game_info = client.get_game_info()
+        self.assertEqual(game_info['userInfo']['sovereignID'], 1)
+        self.assertEqual(client.logins, 2)
+
+    def test_other_errors_are_raised_without_login(self):
+        client = self.client(2)  # game the server doesn't know
+        with self.assertRaises(anacreon.HexArcException):
+            client.get_game_info()
+        self.assertEqual(client.logins, 1)
+        self.assertEqual(self.server.requests, {'login': 1, 'getGameInfo': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import unittest
+
+from lib.standin import api_url, make_server
+from planner import synthetic
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'anatools'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'anatools.settings')
+
+try:
+    import django
+    django.setup()
+    from django.db import connection
+
+    from app.anacreon.collector import Target, collect
+    from app.anacreon.models import GameData, SovereignRollup
+    from lib.client import AnacreonClient, pooled_session
+except ImportError:  # lib/anacreonlib is a git submodule, django is needed by anatools only
+    collect = None
+
+
+@unittest.skipIf(collect is None, 'lib/anacreonlib is not checked out or django is not installed')
+class CollectorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.database = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        connection.creation.destroy_test_db(cls.database, verbosity=0)
+
+    def setUp(self):
+        # two games where the player has the same sovereign id
+        games = {}
+        for game_id in (1, 2):
+            game_info, objects = synthetic.generate(100, sov_id=7, seed=game_id)
+            games[game_id] = {'gameInfo': game_info, 'objects': objects}
+        self.server = make_server(games)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.seen = {}  # game of a client -> game ids of requests sent through its session
+        self.targets = []
+        for login, game_id in (('first', 1), ('second', 2)):
+            session = pooled_session(1, api_url(self.server))
+            session.hooks['response'].append(self.recorder(game_id))
+            self.targets.append(Target(AnacreonClient(login, 'password', game_id, session)))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def recorder(self, game_id: int):
+        def hook(response, *args, **kwargs):
+            body = json.loads(response.request.body or '{}')
+            if 'gameID' in body:
+                self.seen.setdefault(game_id, set()).add(int(body['gameID']))
+        return hook
+
+    def collect(self) -> list:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(collect(self.targets))
+
+    def test_chains_are_kept_per_game(self):
+        self.assertEqual(len(self.collect()), 2)
+        world = next(x for x in self.server.games['2']['objects'] if x.get('class') == 'world')
+        world['techLevel'] += 1
+        self.assertEqual(len(self.collect()), 2)
+
+        for game_id in (1, 2):
+            keyframe, delta = GameData.objects.of(game_id, 7).order_by('id')
+            self.assertFalse(keyframe.is_delta)
+            self.assertTrue(delta.is_delta)
+            self.assertEqual(delta.keyframe_id, keyframe.id)
+            self.assertEqual(delta.full_data()[1], self.server.games[str(game_id)]['objects'])
+            self.assertTrue(SovereignRollup.objects.filter(gameID=game_id, sovID=7).exists())
+
+        # every client sends requests through its own session
+        self.assertEqual(self.seen, {1: {1}, 2: {2}})
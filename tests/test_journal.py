@@ -0,0 +1,67 @@
+import contextlib
+import io
+import json
+import os
+import re
+import tempfile
+import unittest
+
+from planner import synthetic
+from planner.plan import cost
+from planner.replay import ReplayApi
+from planner.scheduler import PRIORITY_CLEANUP, SET_TRADE_ROUTE, STOP_TRADE_ROUTE
+
+try:
+    import create_trade_routes
+except ImportError:  # lib/anacreonlib is a git submodule
+    create_trade_routes = None
+
+
+@unittest.skipIf(create_trade_routes is None, 'lib/anacreonlib is not checked out')
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        game_info, objects = synthetic.generate(200, seed=4)
+        self.api = ReplayApi(game_info, objects)
+
+        # two plain worlds, planner never plans a route between them
+        plain = [x for x in objects if x.get('class') == 'world' and x['sovereignID'] == 1
+                 and x['designation'] not in (synthetic.HUB, synthetic.UNIVERSITY)]
+        self.world, self.partner = next((a['id'], b['id']) for a in plain for b in plain
+                                        if a is not b and not self.api._find_route(a['id'], b['id']))
+
+        # previous run stopped their route and was interrupted before the tech part was recreated
+        self.calls = [[STOP_TRADE_ROUTE, self.world, self.partner],
+                      [SET_TRADE_ROUTE, self.world, self.partner, 'tech', 5, None]]
+        journal = os.path.join(self.tmp.name, 'journal.jsonl')
+        with open(journal, 'w') as f:
+            f.write(json.dumps({'begin': 1, 'priority': PRIORITY_CLEANUP, 'calls': self.calls,
+                                'description': 'clearing'}) + '\n')
+            f.write(json.dumps({'done': 1, 'call': 0}) + '\n')
+        self.files = create_trade_routes.StateFiles(*[None] * len(create_trade_routes.StateFiles._fields))
+        self.files = self.files._replace(journal=journal)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_planner(self, **options) -> tuple:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = create_trade_routes.run(self.api, self.files, full=True, **options)
+        return result, output.getvalue()
+
+    def test_resumed_route_is_not_cleaned_up(self):
+        self.run_planner()
+        pair = [x for x in self.api.mutations if {x[1], x[2]} == {self.world, self.partner}]
+        self.assertEqual(pair, [['set_trade_route', self.world, self.partner, 'tech', 5, None]])
+
+    def test_dry_run_lists_resumed_mutations(self):
+        result, output = self.run_planner(dry_run=True)
+        self.assertIn('Resumed: 1 mutations', output)
+        planned = cost(result.mutations)[SET_TRADE_ROUTE]
+        self.assertEqual(int(re.search(r'API cost: (\d+) setTradeRoute', output).group(1)), planned + 1)
+        self.assertEqual(self.api.mutations, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
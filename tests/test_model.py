@@ -0,0 +1,40 @@
+import unittest
+
+from planner import synthetic
+from planner.catalog import ScenarioCatalog
+from planner.model import Galaxy, World
+
+
+class GalaxyTest(unittest.TestCase):
+    def setUp(self):
+        game_info, self.objects = synthetic.generate(200, seed=3)
+        self.catalog = ScenarioCatalog({x['id']: x for x in game_info['scenarioInfo']})
+
+    def test_foreign_worlds_without_consumption_data(self):
+        # other sovereigns' worlds can come without baseConsumption and traits
+        foreign = [x for x in self.objects if x.get('class') == 'world' and x['sovereignID'] != 1]
+        self.assertTrue(foreign)
+        for obj in foreign:
+            obj.pop('baseConsumption', None)
+            obj.pop('traits', None)
+
+        galaxy = Galaxy(self.objects, self.catalog)
+        self.assertEqual(len(galaxy), len([x for x in self.objects if x.get('class') == 'world']))
+        world = galaxy[foreign[0]['id']]
+        self.assertEqual((world.needs, world.offers, world.has_spaceport), (frozenset(), frozenset(), False))
+        self.assertTrue(any(x.needs for x in galaxy.owned_by(1)))
+
+    def test_only_planned_worlds_are_decoded(self):
+        galaxy = Galaxy(self.objects, self.catalog, 1)
+        obj = next(x for x in self.objects if x.get('class') == 'world' and x['sovereignID'] == 1)
+        world = galaxy[obj['id']]
+        self.assertEqual((world.name, world.pos, world.tech_level), (obj['name'], tuple(obj['pos']), obj['techLevel']))
+        self.assertEqual(world.needs, self.catalog.needs(obj))
+        self.assertFalse(any(getattr(world, x) is obj for x in World.__slots__))  # raw dict isn't kept
+
+        foreign = next(galaxy[x['id']] for x in self.objects if x.get('class') == 'world' and x['sovereignID'] != 1)
+        self.assertEqual((foreign.needs, foreign.offers), (frozenset(), frozenset()))
+
+
+if __name__ == '__main__':
+    unittest.main()
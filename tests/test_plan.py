@@ -0,0 +1,47 @@
+import unittest
+
+from planner.plan import RoutePlan, cost, diff
+from planner.routes import RouteIndex
+from planner.scheduler import PRIORITY_EXPORT, PRIORITY_TECH, SET_TRADE_ROUTE, STOP_TRADE_ROUTE
+
+WORLD, FOND = 1, 2
+RESOURCE = 100
+
+
+class DiffTest(unittest.TestCase):
+    def setUp(self):
+        # world imports a resource from the fond and gets its tech over the same route
+        self.routes = RouteIndex({
+            WORLD: {'id': WORLD, 'tradeRoutes': [{'partnerObjID': FOND, 'imports': [RESOURCE, 100, 0, 0],
+                                                  'importTech': [5]}]},
+            FOND: {'id': FOND, 'tradeRoutes': [{'partnerObjID': WORLD, 'return': True}]},
+        })
+        self.plan = RoutePlan()
+
+    def diff(self) -> list:
+        return diff(self.plan, self.routes, {WORLD, FOND})
+
+    def test_changed_allocation_costs_one_call(self):
+        self.plan.set_trade_route(PRIORITY_EXPORT, WORLD, FOND, 'consumption', 50, RESOURCE)
+        mutations = self.diff()
+        self.assertEqual([x.calls for x in mutations],
+                         [[(SET_TRADE_ROUTE, WORLD, FOND, 'consumption', 50, RESOURCE)]])
+
+    def test_changed_tech_level_costs_one_call(self):
+        self.plan.set_trade_route(PRIORITY_TECH, WORLD, FOND, 'tech', 6)
+        self.assertEqual(cost(self.diff()), {SET_TRADE_ROUTE: 1, STOP_TRADE_ROUTE: 0})
+
+    def test_unchanged_route_costs_nothing(self):
+        self.plan.set_trade_route(PRIORITY_EXPORT, WORLD, FOND, 'consumption', 100, RESOURCE)
+        self.plan.set_trade_route(PRIORITY_TECH, WORLD, FOND, 'tech', 5)
+        self.assertEqual(self.diff(), [])
+
+    def test_cleanup_keeps_tech_part(self):
+        # nothing is planned between them: trade goes, tech is recreated within the same mutation
+        mutations = self.diff()
+        self.assertEqual([x.calls for x in mutations], [[(STOP_TRADE_ROUTE, WORLD, FOND),
+                                                         (SET_TRADE_ROUTE, WORLD, FOND, 'tech', 5, None)]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import contextlib
+import io
+import json
+import os
+import re
+import tempfile
+import unittest
+
+from planner import synthetic
+from planner.replay import ReplayApi
+
+try:
+    import create_trade_routes
+except ImportError:  # lib/anacreonlib is a git submodule
+    create_trade_routes = None
+
+
+def plan(path: str, files, **options) -> tuple:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = create_trade_routes.run(ReplayApi.load(path), files, **options)
+    return result, output.getvalue()
+
+
+def calls(result) -> list:
+    return sorted(json.dumps(x.calls) for x in result.mutations)
+
+
+@unittest.skipIf(create_trade_routes is None, 'lib/anacreonlib is not checked out')
+class PlanCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'galaxy.json')
+        synthetic.save(self.path, *synthetic.generate(400, seed=2))
+        self.files = create_trade_routes.StateFiles(*[None] * len(create_trade_routes.StateFiles._fields))
+        self.files = self.files._replace(plan=os.path.join(self.tmp.name, 'plan.json'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hub_supply_change_invalidates_cached_plan(self):
+        # first run plans everything and stores the plan, its mutations are applied to the stored galaxy
+        api = ReplayApi.load(self.path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_trade_routes.run(api, self.files, full=True)
+        api.save(self.path)
+
+        # every hub gets a new producer that exports it all commodities
+        with open(self.path) as f:
+            data = json.load(f)
+        worlds = {x['id']: x for x in data['gameObjects'] if x.get('class') == 'world'}
+        hubs = [x for x in worlds.values() if x['designation'] == synthetic.HUB and x['sovereignID'] == 1]
+        producers = [x for x in worlds.values() if x['designation'] != synthetic.HUB and x['sovereignID'] == 1]
+        self.assertTrue(hubs)
+        for hub, producer in zip(hubs, producers):
+            imports = [x for resource in synthetic.COMMODITIES for x in (resource, 100, 0, 0)]
+            hub['tradeRoutes'].append({'partnerObjID': producer['id'], 'imports': imports})
+            producer['tradeRoutes'].append({'partnerObjID': hub['id'], 'return': True})
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+
+        cached, output = plan(self.path, self.files, dry_run=True)
+        full, _ = plan(self.path, self.files, dry_run=True, full=True)
+        self.assertGreater(int(re.search(r'(\d+) unchanged', output).group(1)), 0)
+        self.assertEqual(calls(cached), calls(full))
+
+
+if __name__ == '__main__':
+    unittest.main()
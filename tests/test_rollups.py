@@ -0,0 +1,65 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+from planner import synthetic
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'anatools'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'anatools.settings')
+
+try:
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connection, transaction
+    from django.db.models import Sum
+
+    from app.anacreon.models import GameData, SovereignRollup
+    from app.anacreon.rollups import record_rollups
+except ImportError:  # django is needed by anatools only
+    GameData = None
+
+
+@unittest.skipIf(GameData is None, 'django is not installed')
+class RebuildRollupsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.database = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        connection.creation.destroy_test_db(cls.database, verbosity=0)
+
+    def collect(self, seed: int):
+        # what a collector does: snapshot and its rollups in one transaction
+        game_info, objects = synthetic.generate(30, seed=seed)
+        with transaction.atomic():
+            snapshot = GameData.objects.create_snapshot(game_info, objects, sovID=1, gameID=1)
+            record_rollups(snapshot, objects)
+
+    def samples(self) -> int:
+        return SovereignRollup.objects.filter(period='hour', sovereignID=1).aggregate(x=Sum('samples'))['x']
+
+    def test_snapshots_collected_during_rebuild_are_counted_once(self):
+        for seed in range(3):
+            self.collect(seed)
+        self.assertEqual(self.samples(), 3)
+
+        iter_full = GameData.objects.iter_full
+
+        def collecting(*args, **kwargs):
+            self.collect(3)  # collector writes right after old rollups are deleted
+            yield from iter_full(*args, **kwargs)
+
+        with mock.patch.object(GameData.objects, 'iter_full', collecting), \
+                contextlib.redirect_stdout(io.StringIO()):
+            call_command('rebuild_rollups')
+        self.assertEqual(self.samples(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
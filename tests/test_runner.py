@@ -0,0 +1,16 @@
+import contextlib
+import io
+import unittest
+
+from planner.runner import run_targets
+
+
+class RunTargetsTest(unittest.TestCase):
+    def test_no_targets(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(run_targets([], {}, log_dir=None), [])
+        self.assertIn('No targets', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
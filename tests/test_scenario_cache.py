@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from planner import synthetic
+from planner.fake import FakeClock
+from planner.scenario_cache import MAX_AGE, ScenarioCache
+
+
+class ScenarioCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'scenario.pickle')
+        self.clock = FakeClock(1000)
+        self.scenario_info = {x['id']: x for x in synthetic.scenario()}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sovereign_is_kept_per_login(self):
+        cache = ScenarioCache(self.path, clock=self.clock)
+        cache.put('first', 8, 1, self.scenario_info)
+        cache.put('second', 8, 2, self.scenario_info)
+
+        cache = ScenarioCache(self.path, clock=self.clock)
+        self.assertEqual(cache.get('first', 8)['sov_id'], 1)
+        self.assertEqual(cache.get('second', 8)['sov_id'], 2)
+        self.assertIsNone(cache.get('third', 8))
+
+    def test_entry_expires(self):
+        cache = ScenarioCache(self.path, clock=self.clock)
+        cache.put('first', 8, 1, self.scenario_info)
+        self.clock.advance(MAX_AGE + 1)
+        self.assertIsNone(cache.get('first', 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from planner.fake import FakeApi, FakeClock, FakeRateLimitError
+from planner.journal import MutationJournal
+from planner.scheduler import (PRIORITY_CLEANUP, PRIORITY_RESUME, RATE_LIMIT, SET_TRADE_ROUTE, STOP_TRADE_ROUTE,
+                               Budget, MutationScheduler)
+
+MINUTE = 60
+
+
+class ServerError(Exception):
+    pass
+
+
+class FailingApi(FakeApi):
+    def stop_trade_route(self, world_id: int, partner_id: int):
+        if world_id < 0:
+            raise ServerError('no such route')
+        super().stop_trade_route(world_id, partner_id)
+
+
+def stops(count: int, start: int = 0) -> list:
+    return [[(STOP_TRADE_ROUTE, x, x + 1)] for x in range(start, start + count)]
+
+
+def run(scheduler: MutationScheduler, groups: list) -> list:
+    for calls in groups:
+        scheduler.submit(PRIORITY_CLEANUP, calls)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scheduler.run()
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(1000)
+        self.api = FakeApi(self.clock)
+        self.budget = Budget(clock=self.clock)
+
+    def scheduler(self) -> MutationScheduler:
+        return MutationScheduler(self.api, self.budget, errors=(FakeRateLimitError, ServerError))
+
+    def test_limit_holds_over_rolling_hour(self):
+        scheduler = self.scheduler()
+        run(scheduler, stops(RATE_LIMIT))
+        self.assertEqual(scheduler.executed, RATE_LIMIT)
+
+        # half an hour later the window is still full
+        self.clock.advance(30 * MINUTE)
+        scheduler = self.scheduler()
+        deferred = run(scheduler, stops(60, RATE_LIMIT))
+        self.assertEqual((scheduler.executed, scheduler.failed, len(deferred)), (0, 0, 60))
+
+        # first calls drop out of the window an hour after they were made
+        self.clock.advance(30 * MINUTE)
+        scheduler = self.scheduler()
+        deferred = run(scheduler, stops(60, RATE_LIMIT))
+        self.assertEqual((scheduler.executed, scheduler.failed, len(deferred)), (60, 0, 0))
+        self.assertEqual(len(self.api.calls), RATE_LIMIT + 60)
+
+    def test_failed_calls_are_not_counted(self):
+        self.api = FailingApi(self.clock)
+        scheduler = self.scheduler()
+        run(scheduler, [[(STOP_TRADE_ROUTE, -1, 1)]] * 10)
+        self.assertEqual(scheduler.failed, 10)
+        self.assertEqual(self.budget.available(STOP_TRADE_ROUTE), RATE_LIMIT)
+
+    def test_rate_limit_error_defers_the_rest(self):
+        # calls made outside of the budget, e.g. by hand in the game client
+        for _ in range(RATE_LIMIT):
+            self.api.stop_trade_route(0, 1)
+
+        scheduler = self.scheduler()
+        deferred = run(scheduler, stops(5))
+        self.assertEqual((scheduler.executed, scheduler.failed, len(deferred)), (0, 0, 5))
+        self.assertEqual(self.budget.available(STOP_TRADE_ROUTE), 0)
+
+    def test_rate_limited_resume_stays_in_journal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'journal.jsonl')
+            journal = MutationJournal(path)
+            calls = [(STOP_TRADE_ROUTE, 1, 2), (SET_TRADE_ROUTE, 1, 2, 'tech', 5, None)]
+            group = journal.begin(PRIORITY_CLEANUP, calls, 'clearing')
+            journal.done(group, 0)
+            journal.close()
+
+            # tech recreate is resumed, but the server has no calls left for it
+            for _ in range(RATE_LIMIT):
+                self.api.set_trade_route(0, 1, 'tech', 5)
+            journal = MutationJournal(path)
+            scheduler = MutationScheduler(self.api, self.budget, errors=(FakeRateLimitError,), journal=journal)
+            scheduler.submit(PRIORITY_RESUME, calls[1:], 'clearing', group, 1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                deferred = scheduler.run()
+            journal.close()
+
+            self.assertEqual(len(deferred), 1)
+            self.assertEqual([x['begin'] for x in MutationJournal(path).pending()], [group])
+
+    def test_budget_is_kept_between_runs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'budget.json')
+            self.budget = Budget(path, clock=self.clock)
+            run(self.scheduler(), stops(100))
+
+            self.clock.advance(59 * MINUTE)
+            self.assertEqual(Budget(path, clock=self.clock).available(STOP_TRADE_ROUTE), RATE_LIMIT - 100)
+            self.clock.advance(MINUTE)
+            self.assertEqual(Budget(path, clock=self.clock).available(STOP_TRADE_ROUTE), RATE_LIMIT)
+
+
+if __name__ == '__main__':
+    unittest.main()
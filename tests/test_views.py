@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import unittest
+
+from planner import synthetic
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'anatools'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'anatools.settings')
+
+try:
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test import RequestFactory
+
+    from app.anacreon import views
+    from app.anacreon.models import GameData
+    from app.anacreon.snapshots import record_snapshot
+except ImportError:  # django is needed by anatools only
+    views = None
+
+
+@unittest.skipIf(views is None, 'django is not installed')
+class PageTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.database = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+        game_info, objects = synthetic.generate(30, seed=6)
+        cls.snapshot = GameData.objects.create_snapshot(game_info, objects, sovID=1, gameID=1)
+        record_snapshot(cls.snapshot, objects)
+        cls.world_id = next(x['id'] for x in objects if x.get('class') == 'world')
+
+    @classmethod
+    def tearDownClass(cls):
+        connection.creation.destroy_test_db(cls.database, verbosity=0)
+
+    def get(self, view, path: str, **kwargs):
+        return view(RequestFactory().get(path), **kwargs)
+
+    def test_limit_below_one_is_bad_request(self):
+        for limit in ('0', '-1'):
+            response = self.get(views.route_list, '/api/routes/?limit=' + limit)
+            self.assertEqual(response.status_code, 400)
+            response = self.get(views.world_history, '/api/worlds/%d/history/?limit=%s' % (self.world_id, limit),
+                                obj_id=self.world_id)
+            self.assertEqual(response.status_code, 400)
+
+    def test_limit_of_one(self):
+        response = self.get(views.route_list, '/api/routes/?limit=1')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['next'], data['results'][0]['id'])
+
+
+if __name__ == '__main__':
+    unittest.main()